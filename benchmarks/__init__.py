@@ -0,0 +1 @@
+"""Benchmarks of the Österreichsenergie Smart-Meter-Adapter integration."""
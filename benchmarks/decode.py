@@ -0,0 +1,72 @@
+"""
+Compare the decode paths of a measurement.json body.
+
+``text`` decodes the body to a str and parses it with the standard library, as
+``aiohttp.ClientResponse.json`` does. ``bytes`` parses the raw body with the
+decoder of the API client, which is orjson when it is installed.
+
+    python3 -m benchmarks.decode
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+from timeit import Timer
+from typing import TYPE_CHECKING
+
+from custom_components.oesterreichsenergie_sma.api import json_loads
+from custom_components.oesterreichsenergie_sma.measurement import parse_measurement
+
+from .fake_adapter import FakeAdapter
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+def _decode_text(body: bytes) -> None:
+    parse_measurement(json.loads(body.decode("utf-8")))
+
+
+def _decode_bytes(body: bytes) -> None:
+    parse_measurement(json_loads(body))
+
+
+def _microseconds_per_frame(
+    function: Callable[[bytes], None], body: bytes, number: int
+) -> float:
+    """Return the best time of a decode path in microseconds per frame."""
+    timer = Timer(lambda: function(body))
+    return round(min(timer.repeat(repeat=5, number=number)) / number * 1e6, 2)
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--extra-registers", type=int, nargs="+", default=[0, 50, 200])
+    args = parser.parse_args()
+
+    adapter = FakeAdapter(0, random.Random(0))  # noqa: S311 Not used for cryptography
+    results = []
+    for extra_registers in args.extra_registers:
+        body = json.dumps(adapter.measurement(extra_registers)).encode()
+        text = _microseconds_per_frame(_decode_text, body, args.number)
+        fast = _microseconds_per_frame(_decode_bytes, body, args.number)
+        results.append(
+            {
+                "payload_bytes": len(body),
+                "text_us": text,
+                "bytes_us": fast,
+                "speedup": round(text / fast, 2),
+            }
+        )
+    sys.stdout.write(json.dumps(results, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Local stand-in for the JSON API of the Smart Meter Adapter.
+
+Every adapter is served below its own path prefix, e.g.
+``http://127.0.0.1:<port>/0/api/v1/measurement.json``. Each measurement
+request returns a new frame, one second after the previous one.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import sys
+from dataclasses import dataclass
+from typing import Any
+
+from aiohttp import web
+
+# Meter time of the first frame, at the start of an hour
+FRAME_START = 1_750_000_000 - 1_750_000_000 % 3600
+
+ENERGY_KEYS = ("1-0:1.8.0", "1-0:2.8.0", "1-0:3.8.0", "1-0:4.8.0")
+POWER_KEYS = ("1-0:1.7.0", "1-0:2.7.0", "1-0:3.7.0", "1-0:4.7.0")
+VOLTAGE_KEYS = ("1-0:32.7.0", "1-0:52.7.0", "1-0:72.7.0")
+CURRENT_KEYS = ("1-0:31.7.0", "1-0:51.7.0", "1-0:71.7.0")
+
+STATUS = {
+    "name": "Benchmark Adapter",
+    "fw_version": "1.0.0",
+    "idf_version": "v5.0",
+    "sma_module_type": "SMA",
+    "sma_module_type_id": "1",
+    "wifi": {"mac": ""},
+    "meter": {
+        "name": "Benchmark Meter",
+        "manufacturer": "Fake",
+        "supplier": "Fake",
+        "supplier_id": "1",
+    },
+}
+
+
+@dataclass(slots=True)
+class FakeAdapterConfig:
+    """Behaviour of the fake adapters."""
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    extra_registers: int = 0
+    seed: int = 0
+
+
+class FakeAdapter:
+    """Measurement frames of one fake adapter."""
+
+    def __init__(self, index: int, rng: random.Random) -> None:
+        """Initialize the adapter."""
+        self.index = index
+        self.rng = rng
+        self.frame = 0
+        self.energy = dict.fromkeys(ENERGY_KEYS, 1_000_000.0)
+
+    def measurement(self, extra_registers: int) -> dict[str, Any]:
+        """Return the next measurement frame."""
+        time = FRAME_START + self.frame
+        self.frame += 1
+
+        power = {key: self.rng.uniform(0, 5000) for key in POWER_KEYS}
+        for energy_key, power_key in zip(ENERGY_KEYS, POWER_KEYS, strict=True):
+            self.energy[energy_key] += power[power_key] / 3600
+
+        registers: dict[str, Any] = {
+            "0-0:1.0.0": time,
+            "0-0:96.1.0": f"FAKE{self.index:010d}",
+            **self.energy,
+            **power,
+            **{key: self.rng.gauss(230, 2) for key in VOLTAGE_KEYS},
+            **{key: self.rng.uniform(0, 16) for key in CURRENT_KEYS},
+            "1-0:13.7.0": self.rng.uniform(0.8, 1),
+            **{f"1-0:99.{number}.0": number for number in range(extra_registers)},
+        }
+        return {
+            **{key: {"value": value, "time": time} for key, value in registers.items()},
+            "api_version": "v1",
+            "sma_time": time,
+        }
+
+
+def create_app(adapters: int, config: FakeAdapterConfig) -> web.Application:
+    """Return the application serving ``adapters`` fake adapters."""
+    rng = random.Random(config.seed)  # noqa: S311 Not used for cryptography
+    fakes = [FakeAdapter(index, rng) for index in range(adapters)]
+
+    async def _respond(request: web.Request) -> FakeAdapter:
+        delay = config.latency + rng.uniform(-config.jitter, config.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if rng.random() < config.error_rate:
+            raise web.HTTPInternalServerError
+        index = int(request.match_info["index"])
+        if not 0 <= index < adapters:
+            raise web.HTTPNotFound
+        return fakes[index]
+
+    async def _handle_measurement(request: web.Request) -> web.Response:
+        fake = await _respond(request)
+        return web.json_response(fake.measurement(config.extra_registers))
+
+    async def _handle_status(request: web.Request) -> web.Response:
+        fake = await _respond(request)
+        return web.json_response(
+            {**STATUS, "wifi": {"mac": f"02:00:00:00:{fake.index:04x}"}}
+        )
+
+    app = web.Application()
+    app.router.add_get("/{index}/api/v1/measurement.json", _handle_measurement)
+    app.router.add_get("/{index}/api/v1/status.json", _handle_status)
+    return app
+
+
+async def _serve(adapters: int, config: FakeAdapterConfig) -> None:
+    """Serve the fake adapters and print the port once listening."""
+    runner = web.AppRunner(create_app(adapters, config), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    sys.stdout.write(f"{port}\n")
+    sys.stdout.flush()
+    await asyncio.Event().wait()
+
+
+def main() -> None:
+    """Run the fake adapters as a standalone server."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--adapters", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--extra-registers", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(
+        _serve(
+            args.adapters,
+            FakeAdapterConfig(
+                latency=args.latency,
+                jitter=args.jitter,
+                error_rate=args.error_rate,
+                extra_registers=args.extra_registers,
+                seed=args.seed,
+            ),
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Measure the import time of the integration with ``python -X importtime``.
+
+Every run imports the Home Assistant modules that are loaded before the
+integration in a fresh interpreter first, then the integration with the
+modules Home Assistant imports to set up a config entry. Only the second part
+is measured, including third-party modules imported on the way. The median of
+the runs is reported, in total and for the slowest modules by their own time.
+
+    python3 -m benchmarks.importtime --runs 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from statistics import median
+
+# Loaded by Home Assistant before the integration, or by its dependencies
+PRELOADED = (
+    "homeassistant.core",
+    "homeassistant.config_entries",
+    "homeassistant.helpers.device_registry",
+    "homeassistant.helpers.entity_registry",
+    "homeassistant.helpers.event",
+    "homeassistant.helpers.storage",
+    "homeassistant.helpers.update_coordinator",
+    "homeassistant.components.recorder",
+    "homeassistant.components.sensor",
+)
+# Imported by Home Assistant to set up a config entry of the integration
+MODULES = (
+    "custom_components.oesterreichsenergie_sma",
+    "custom_components.oesterreichsenergie_sma.config_flow",
+    "custom_components.oesterreichsenergie_sma.sensor",
+)
+MARKER = "-- integration --"
+DEFAULT_RUNS = 5
+DEFAULT_TOP = 10
+
+
+def _import_times(modules: list[str]) -> dict[str, int]:
+    """Import the modules in a fresh interpreter, return their own times in µs."""
+    code = (
+        f"import {', '.join(PRELOADED)}\n"
+        f"import sys; sys.stderr.write({MARKER!r} + '\\n')\n"
+        f"import {', '.join(modules)}\n"
+    )
+    result = subprocess.run(  # noqa: S603 Runs the current interpreter
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        # measure with bytecode caches, as on an installed system
+        env={
+            key: value
+            for key, value in os.environ.items()
+            if key != "PYTHONDONTWRITEBYTECODE"
+        },
+    )
+    times = {}
+    measured = False
+    for line in result.stderr.splitlines():
+        if line == MARKER:
+            measured = True
+        elif measured and line.startswith("import time:"):
+            own, _, name = line.removeprefix("import time:").split("|")
+            times[name.strip()] = int(own)
+    return times
+
+
+def main() -> int:
+    """Run the import time benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP)
+    parser.add_argument(
+        "--module",
+        action="append",
+        dest="modules",
+        help="module to import instead of the default set, may be repeated",
+    )
+    args = parser.parse_args()
+    if args.runs < 1:
+        parser.error("--runs must be at least 1")
+    modules = args.modules or list(MODULES)
+
+    # the first run only compiles the bytecode caches
+    _import_times(modules)
+    runs = [_import_times(modules) for _ in range(args.runs)]
+    names = {name for times in runs for name in times}
+    own = {name: median(times.get(name, 0) for times in runs) for name in names}
+    slowest = sorted(own.items(), key=lambda item: item[1], reverse=True)
+    report = {
+        "parameters": {"runs": args.runs, "modules": modules},
+        "results": {
+            "total_ms": round(median(sum(times.values()) for times in runs) / 1000, 2),
+            "modules": len(names),
+            "slowest_ms": {
+                name: round(time / 1000, 2) for name, time in slowest[: args.top]
+            },
+        },
+    }
+    sys.stdout.write(json.dumps(report, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""
+Replay captured adapter responses through the integration.
+
+Captures are recorded by the integration when the capture option of an adapter
+is enabled. Every virtual adapter is set up as a config entry in a test
+instance of Home Assistant from the first captured status, with polling
+disabled. The captured measurements are handed to every
+``SMAMeasurementDataUpdateCoordinator`` the way pushed frames are, as fast as
+possible or at ``--speed`` times the captured pace. Statistics are imported
+into a recorder in the temporary configuration whenever the frames cross a full hour.
+
+    python3 -m benchmarks.replay config/oesterreichsenergie_sma/capture-<id>.jsonl.gz
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+from itertools import islice
+from pathlib import Path
+from statistics import fmean, quantiles
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import TYPE_CHECKING, Any
+
+from homeassistant import loader
+from homeassistant.const import CONF_HOST, CONF_TOKEN, CONF_VERIFY_SSL
+from homeassistant.helpers import frame
+from homeassistant.helpers import recorder as recorder_helper
+from homeassistant.setup import async_setup_component
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_test_home_assistant,
+)
+
+from custom_components.oesterreichsenergie_sma.api import (
+    MEASUREMENT_ENDPOINT,
+    STATUS_ENDPOINT,
+    json_loads,
+)
+from custom_components.oesterreichsenergie_sma.capture import read_capture
+from custom_components.oesterreichsenergie_sma.const import DOMAIN
+from custom_components.oesterreichsenergie_sma.coordinator import status_store
+
+from .fake_adapter import STATUS
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from homeassistant.core import HomeAssistant
+
+    from custom_components.oesterreichsenergie_sma.data import SMAConfigEntry
+
+# Records read from the capture at once, outside of the event loop
+READ_BATCH_SIZE = 1000
+
+
+def _first_status(path: Path) -> dict[str, Any]:
+    """Return the first captured status, or the one of the fake adapters."""
+    for _, endpoint, body in read_capture(path):
+        if endpoint == STATUS_ENDPOINT:
+            return json_loads(body)
+    return STATUS
+
+
+async def _async_setup_adapters(
+    hass: HomeAssistant, adapters: int, status: dict[str, Any]
+) -> list[SMAConfigEntry]:
+    """Set up a config entry for every virtual adapter from the stored status."""
+    entries = []
+    for index in range(adapters):
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            unique_id=f"replay_{index}",
+            title=f"Replay Adapter {index}",
+            data={
+                # never reachable, the first refresh fails once
+                CONF_HOST: "http://127.0.0.1:1",
+                CONF_TOKEN: "replay",
+                CONF_VERIFY_SSL: False,
+            },
+            pref_disable_polling=True,
+        )
+        entry.add_to_hass(hass)
+        await status_store(hass, entry).async_save(status)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done(wait_background_tasks=True)
+        entries.append(entry)
+    return entries
+
+
+async def _async_replay(
+    hass: HomeAssistant,
+    entries: list[SMAConfigEntry],
+    records: Iterator[tuple[float, str, bytes]],
+    speed: float,
+) -> list[float]:
+    """Hand the captured responses to every adapter, return the handling times."""
+    durations = []
+    start = perf_counter()
+    first: float | None = None
+    while batch := await hass.async_add_executor_job(
+        list, islice(records, READ_BATCH_SIZE)
+    ):
+        for time, endpoint, body in batch:
+            if speed:
+                first = time if first is None else first
+                delay = (time - first) / speed - (perf_counter() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            for entry in entries:
+                if endpoint == STATUS_ENDPOINT:
+                    entry.runtime_data.status_coordinator.async_set_updated_data(
+                        json_loads(body)
+                    )
+                elif endpoint == MEASUREMENT_ENDPOINT:
+                    coordinator = entry.runtime_data.measurement_coordinator
+                    handle_start = perf_counter()
+                    coordinator.async_handle_frame(body)
+                    durations.append(perf_counter() - handle_start)
+            # let the recorder and other tasks keep up with the frames
+            await asyncio.sleep(0)
+    return durations
+
+
+async def async_replay(path: Path, adapters: int, speed: float) -> dict[str, Any]:
+    """Replay a capture and return the results."""
+    status = await asyncio.to_thread(_first_status, path)
+    with TemporaryDirectory() as config_dir:
+        async with async_test_home_assistant(config_dir=config_dir) as hass:
+            # allow loading the integration from custom_components
+            hass.data.pop(loader.DATA_CUSTOM_COMPONENTS)
+            # set up during bootstrap in a real instance
+            frame.async_setup(hass)
+            recorder_helper.async_initialize_recorder(hass)
+            await async_setup_component(hass, "recorder", {"recorder": {}})
+            entries = await _async_setup_adapters(hass, adapters, status)
+
+            start = perf_counter()
+            durations = await _async_replay(hass, entries, read_capture(path), speed)
+            await hass.async_block_till_done()
+            wall = perf_counter() - start
+
+            dropped = sum(
+                entry.runtime_data.measurement_coordinator.dropped_frames
+                for entry in entries
+            )
+            rejected = sum(
+                entry.runtime_data.measurement_coordinator.validator.rejected_frames
+                for entry in entries
+            )
+            for entry in entries:
+                await hass.config_entries.async_unload(entry.entry_id)
+            # stops the recorder thread
+            await hass.async_stop()
+
+    percentiles = quantiles(durations, n=100) if len(durations) > 1 else [0.0] * 99
+    return {
+        "frames": len(durations),
+        "dropped_frames": dropped,
+        "rejected_frames": rejected,
+        "wall_s": round(wall, 3),
+        "frames_per_s": round(len(durations) / wall, 1) if wall else 0.0,
+        "handle_mean_ms": round(fmean(durations) * 1000, 3) if durations else 0.0,
+        "handle_p50_ms": round(percentiles[49] * 1000, 3),
+        "handle_p95_ms": round(percentiles[94] * 1000, 3),
+    }
+
+
+def main() -> int:
+    """Run the replay from the command line."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("capture", type=Path)
+    parser.add_argument("--adapters", type=int, default=1)
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=0.0,
+        help="multiple of the captured pace, 0 replays as fast as possible",
+    )
+    args = parser.parse_args()
+    if args.adapters < 1:
+        parser.error("--adapters must be at least 1")
+    if args.speed < 0:
+        parser.error("--speed must not be negative")
+
+    results = asyncio.run(async_replay(args.capture, args.adapters, args.speed))
+    report = {
+        "parameters": {
+            "capture": str(args.capture),
+            "adapters": args.adapters,
+            "speed": args.speed,
+        },
+        "results": results,
+    }
+    sys.stdout.write(json.dumps(report, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
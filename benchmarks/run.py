@@ -0,0 +1,271 @@
+"""
+Benchmark the poll path of the integration against local fake adapters.
+
+Every adapter is set up as a config entry in a test instance of Home Assistant
+and polled through ``SMAMeasurementDataUpdateCoordinator`` until the sensor
+states are written. The fake adapters run in a separate process, so the CPU
+time only covers Home Assistant and the integration.
+
+    python3 -m benchmarks.run --baseline benchmarks/baseline.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from statistics import quantiles
+from tempfile import TemporaryDirectory
+from time import perf_counter, process_time
+from typing import TYPE_CHECKING, Any
+
+from homeassistant import loader
+from homeassistant.const import (
+    CONF_HOST,
+    CONF_TOKEN,
+    CONF_VERIFY_SSL,
+    EVENT_STATE_CHANGED,
+)
+from homeassistant.core import callback
+from homeassistant.helpers import frame
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_test_home_assistant,
+)
+
+from custom_components.oesterreichsenergie_sma.const import DOMAIN
+
+if TYPE_CHECKING:
+    from homeassistant.core import Event, HomeAssistant
+
+    from custom_components.oesterreichsenergie_sma.coordinator import (
+        SMAMeasurementDataUpdateCoordinator,
+    )
+
+# Frames polled per adapter before the measurement, e.g. to allocate buffers
+WARMUP_FRAMES = 10
+# Largest relative increase of a result over the baseline
+DEFAULT_TOLERANCE = 0.5
+# Results where a larger value is a regression
+COMPARED_RESULTS = (
+    "latency_p50_ms",
+    "latency_p95_ms",
+    "cpu_per_frame_ms",
+    "memory_per_adapter_kib",
+)
+# Results compared by an absolute allowance, a relative one of 0 is none
+ALLOWED_INCREASES = {
+    "skipped_polls": 5,
+}
+
+
+@dataclass(slots=True)
+class BenchmarkParameters:
+    """Parameters of a benchmark run."""
+
+    adapters: int = 2
+    frames: int = 500
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    extra_registers: int = 0
+    seed: int = 0
+
+
+async def _start_fake_adapters(
+    parameters: BenchmarkParameters,
+) -> tuple[asyncio.subprocess.Process, int]:
+    """Start the fake adapters in a separate process, return it and its port."""
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "benchmarks.fake_adapter",
+        f"--adapters={parameters.adapters}",
+        f"--latency={parameters.latency}",
+        f"--jitter={parameters.jitter}",
+        f"--error-rate={parameters.error_rate}",
+        f"--extra-registers={parameters.extra_registers}",
+        f"--seed={parameters.seed}",
+        stdout=asyncio.subprocess.PIPE,
+    )
+    assert process.stdout is not None  # noqa: S101 Guaranteed by stdout=PIPE
+    port = int(await process.stdout.readline())
+    return process, port
+
+
+async def _async_setup_adapters(
+    hass: HomeAssistant, indexes: range, port: int
+) -> list[SMAMeasurementDataUpdateCoordinator]:
+    """Set up a config entry for the fake adapters."""
+    coordinators = []
+    for index in indexes:
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            unique_id=f"benchmark_{index}",
+            title=f"Benchmark Adapter {index}",
+            data={
+                CONF_HOST: f"http://127.0.0.1:{port}/{index}",
+                CONF_TOKEN: "benchmark",
+                CONF_VERIFY_SSL: False,
+            },
+        )
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinators.append(entry.runtime_data.measurement_coordinator)
+    return coordinators
+
+
+async def _async_poll(
+    hass: HomeAssistant,
+    coordinators: list[SMAMeasurementDataUpdateCoordinator],
+    frames: int,
+) -> list[float]:
+    """Poll every adapter, return the poll-to-state-write latencies."""
+    written: float | None = None
+
+    @callback
+    def _state_changed(_: Event) -> None:
+        nonlocal written
+        written = perf_counter()
+
+    unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, _state_changed)
+    latencies = []
+    for _ in range(frames):
+        for coordinator in coordinators:
+            written = None
+            start = perf_counter()
+            await coordinator.async_refresh()
+            if coordinator.last_update_success and written is not None:
+                latencies.append(written - start)
+    unsub()
+    return latencies
+
+
+async def async_benchmark(parameters: BenchmarkParameters) -> dict[str, float]:
+    """Run the benchmark and return its results."""
+    process, port = await _start_fake_adapters(parameters)
+    try:
+        with TemporaryDirectory() as config_dir:
+            async with async_test_home_assistant(config_dir=config_dir) as hass:
+                # allow loading the integration from custom_components
+                hass.data.pop(loader.DATA_CUSTOM_COMPONENTS)
+                # set up during bootstrap in a real instance
+                frame.async_setup(hass)
+                # statistics are imported at full hours only, which the frames
+                # of a run do not cross
+                hass.config.components.add("recorder")
+
+                # the first adapter loads the platforms, the memory of the
+                # others is the cost of an additional adapter
+                coordinators = await _async_setup_adapters(hass, range(1), port)
+                await _async_poll(hass, coordinators, WARMUP_FRAMES)
+                tracemalloc.start()
+                before = tracemalloc.get_traced_memory()[0]
+                added = await _async_setup_adapters(
+                    hass, range(1, parameters.adapters), port
+                )
+                await _async_poll(hass, added, WARMUP_FRAMES)
+                memory = tracemalloc.get_traced_memory()[0] - before
+                tracemalloc.stop()
+                coordinators += added
+
+                cpu = process_time()
+                latencies = await _async_poll(hass, coordinators, parameters.frames)
+                cpu = process_time() - cpu
+
+                for entry in hass.config_entries.async_entries(DOMAIN):
+                    await hass.config_entries.async_unload(entry.entry_id)
+                await hass.async_block_till_done()
+    finally:
+        process.terminate()
+        await process.wait()
+
+    percentiles = quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        "latency_p50_ms": round(percentiles[49] * 1000, 3),
+        "latency_p95_ms": round(percentiles[94] * 1000, 3),
+        "cpu_per_frame_ms": round(cpu / max(len(latencies), 1) * 1000, 3),
+        "memory_per_adapter_kib": round(memory / (parameters.adapters - 1) / 1024, 1),
+        # failed requests and frames without a state change
+        "skipped_polls": parameters.frames * parameters.adapters - len(latencies),
+    }
+
+
+def compare(
+    results: dict[str, float], baseline: dict[str, float], tolerance: float
+) -> list[str]:
+    """Return the results which regressed against the baseline."""
+    regressions = [
+        f"{key}: {results[key]} > {baseline[key]} (+{tolerance:.0%})"
+        for key in COMPARED_RESULTS
+        if key in baseline and results[key] > baseline[key] * (1 + tolerance)
+    ]
+    regressions.extend(
+        f"{key}: {results[key]} > {baseline[key]} (+{allowance})"
+        for key, allowance in ALLOWED_INCREASES.items()
+        if key in baseline and results[key] > baseline[key] + allowance
+    )
+    return regressions
+
+
+def main() -> int:
+    """Run the benchmark from the command line."""
+    defaults = BenchmarkParameters()
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--adapters", type=int, default=defaults.adapters)
+    parser.add_argument("--frames", type=int, default=defaults.frames)
+    parser.add_argument("--latency", type=float, default=defaults.latency)
+    parser.add_argument("--jitter", type=float, default=defaults.jitter)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--extra-registers", type=int, default=defaults.extra_registers)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--baseline", type=Path, help="compare against a baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument(
+        "--update-baseline", action="store_true", help="store the results instead"
+    )
+    args = parser.parse_args()
+    # one frame per second, the run must stay within the first hour
+    if not 0 < args.frames + WARMUP_FRAMES < 3600:  # noqa: PLR2004 Frames per hour
+        parser.error("--frames must be below 3590")
+    if args.adapters < 2:  # noqa: PLR2004 The first adapter is not measured
+        parser.error("--adapters must be at least 2")
+
+    parameters = BenchmarkParameters(
+        adapters=args.adapters,
+        frames=args.frames,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        extra_registers=args.extra_registers,
+        seed=args.seed,
+    )
+    results = asyncio.run(async_benchmark(parameters))
+    report: dict[str, Any] = {"parameters": asdict(parameters), "results": results}
+    sys.stdout.write(json.dumps(report, indent=2) + "\n")
+
+    if args.baseline is None:
+        return 0
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())
+    if baseline["parameters"] != report["parameters"]:
+        sys.stderr.write("Parameters differ from the baseline\n")
+        return 2
+    if regressions := compare(results, baseline["results"], args.tolerance):
+        sys.stderr.write("Regressions:\n" + "\n".join(regressions) + "\n")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
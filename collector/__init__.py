@@ -0,0 +1,11 @@
+"""
+Headless collector archiving the full-rate frames of Smart Meter Adapters.
+
+The adapters are polled with ``SMAApiClient`` outside of Home Assistant and
+their frames are written in batches to InfluxDB line protocol, Prometheus
+remote-write or Parquet files. The integration package is imported for the
+client and the parser, so Home Assistant has to be installed, but it is never
+started.
+
+    python3 -m collector collector/config.example.toml
+"""
@@ -0,0 +1,282 @@
+"""
+Poll Smart Meter Adapters and write their frames to time-series sinks.
+
+Every adapter is polled by its own task, aligned to the frame clock of the
+meter, and only frames with a new meter time are kept. The frames are queued
+for a single writer, which hands them to every sink in batches of up to
+``batch_size`` frames, at least every ``flush_interval`` seconds. A failed
+batch is retried until it is written, meanwhile the queue fills up and the
+pollers wait for room, so a slow sink slows down the polls instead of growing
+the memory.
+
+    python3 -m collector collector/config.example.toml
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import signal
+import sys
+import tomllib
+from contextlib import suppress
+from dataclasses import dataclass, field
+from math import isfinite
+from pathlib import Path
+from time import time
+from typing import TYPE_CHECKING, Any
+
+import aiohttp
+
+from custom_components.oesterreichsenergie_sma.api import (
+    SMAApiClient,
+    SMAApiClientError,
+    create_trace_config,
+)
+from custom_components.oesterreichsenergie_sma.const import (
+    KEEPALIVE_TIMEOUT,
+    MAX_IN_FLIGHT,
+)
+from custom_components.oesterreichsenergie_sma.derived import MEASUREMENT_KEYS
+from custom_components.oesterreichsenergie_sma.measurement import (
+    FRAME_TIME_KEY,
+    parse_measurement,
+)
+from custom_components.oesterreichsenergie_sma.scheduler import SMAFrameScheduler
+
+from .sinks import CollectedFrame, create_sink
+
+if TYPE_CHECKING:
+    from custom_components.oesterreichsenergie_sma.measurement import SMAMeasurement
+
+    from .sinks import SMASink
+
+LOGGER = logging.getLogger(__package__)
+
+# Seconds between the retries of a failed batch, doubled up to the maximum
+RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 60.0
+
+
+@dataclass(slots=True)
+class CollectorConfig:
+    """Configuration of the collector, as read from the TOML file."""
+
+    adapters: list[dict[str, Any]]
+    sinks: list[dict[str, Any]]
+    # nominal poll interval in seconds, until the frame clock is learned
+    interval: float = 1.0
+    batch_size: int = 1000
+    flush_interval: float = 5.0
+    # frames queued for the writer before the pollers wait
+    queue_size: int = 10_000
+    names: list[str] = field(init=False)
+
+    def __post_init__(self) -> None:
+        """Validate the configuration."""
+        if not self.adapters or not self.sinks:
+            msg = "At least one adapter and one sink are needed"
+            raise ValueError(msg)
+        self.names = [
+            adapter.get("name", f"adapter_{index}")
+            for index, adapter in enumerate(self.adapters)
+        ]
+        if len(set(self.names)) != len(self.names):
+            msg = "The adapter names are not unique"
+            raise ValueError(msg)
+
+
+def load_config(path: Path) -> CollectorConfig:
+    """Read the configuration from a TOML file, blocking."""
+    with path.open("rb") as file:
+        return CollectorConfig(**tomllib.load(file))
+
+
+def frame_values(data: SMAMeasurement) -> dict[str, float]:
+    """Return the finite numeric values of a frame, without its timestamp."""
+    values = {}
+    for slot, key in enumerate(MEASUREMENT_KEYS):
+        if (
+            key != FRAME_TIME_KEY
+            and data.present >> slot & 1
+            and isinstance(value := data.values[slot], int | float)
+            and not isinstance(value, bool)
+            and isfinite(value)
+        ):
+            values[key] = float(value)
+    return values
+
+
+class SMACollector:
+    """Pollers of all adapters feeding a batched writer through a bounded queue."""
+
+    def __init__(self, config: CollectorConfig) -> None:
+        """Initialize the collector."""
+        self.config = config
+        self.queue: asyncio.Queue[CollectedFrame] = asyncio.Queue(config.queue_size)
+        self.frames_written = 0
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        """Stop polling and write the queued frames."""
+        self._stopping.set()
+
+    async def async_run(self) -> None:
+        """Run until stopped."""
+        sinks = [create_sink(sink) for sink in self.config.sinks]
+        semaphore = asyncio.Semaphore(MAX_IN_FLIGHT)
+        async with aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=MAX_IN_FLIGHT, keepalive_timeout=KEEPALIVE_TIMEOUT
+            ),
+            trace_configs=[create_trace_config()],
+        ) as session:
+            for sink in sinks:
+                await sink.async_open(session)
+            pollers = []
+            for index, (name, adapter) in enumerate(
+                zip(self.config.names, self.config.adapters, strict=True)
+            ):
+                client = SMAApiClient(
+                    adapter["host"],
+                    adapter["token"],
+                    session,
+                    adapter.get("version", "v1"),
+                    verify_ssl=adapter.get("verify_ssl", True),
+                    semaphore=semaphore,
+                )
+                scheduler = SMAFrameScheduler(self.config.interval)
+                # spread the polls of the adapters evenly, like the hub does
+                scheduler.phase = index * scheduler.interval / len(self.config.names)
+                pollers.append(
+                    asyncio.create_task(self._async_poll(name, client, scheduler))
+                )
+            writer = asyncio.create_task(self._async_write(sinks))
+
+            await self._stopping.wait()
+            for poller in pollers:
+                poller.cancel()
+            await asyncio.gather(*pollers, return_exceptions=True)
+            await self.queue.join()
+            writer.cancel()
+            await asyncio.gather(writer, return_exceptions=True)
+            for sink in sinks:
+                await sink.async_close()
+        LOGGER.info("Wrote %d frames", self.frames_written)
+
+    async def _async_poll(
+        self, name: str, client: SMAApiClient, scheduler: SMAFrameScheduler
+    ) -> None:
+        """Poll an adapter and queue every new frame."""
+        last_time = None
+        while True:
+            try:
+                data = parse_measurement(await client.async_get_measurement())
+            except SMAApiClientError as exception:
+                LOGGER.warning("Polling %s failed - %s", name, exception)
+            else:
+                received = time()
+                if data.time is not None:
+                    scheduler.observe(float(data.time), received)
+                if data.time is None or data.time != last_time:
+                    last_time = data.time
+                    frame_time = float(data.time) if data.time is not None else received
+                    # waits while the queue is full, so a slow sink slows the polls
+                    await self.queue.put(
+                        CollectedFrame(name, frame_time, frame_values(data))
+                    )
+            await asyncio.sleep(scheduler.next_delay(time()))
+
+    async def _async_next_batch(self) -> list[CollectedFrame]:
+        """Wait for the next batch, full or due."""
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.config.flush_interval
+        while len(batch) < self.config.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            if self._stopping.is_set() or (timeout := deadline - loop.time()) <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except TimeoutError:
+                break
+        return batch
+
+    async def _async_write(self, sinks: list[SMASink]) -> None:
+        """Write the queued frames in batches to every sink."""
+        while True:
+            batch = await self._async_next_batch()
+            await asyncio.gather(
+                *(self._async_write_sink(sink, batch) for sink in sinks)
+            )
+            self.frames_written += len(batch)
+            for _ in batch:
+                self.queue.task_done()
+
+    async def _async_write_sink(
+        self, sink: SMASink, batch: list[CollectedFrame]
+    ) -> None:
+        """Write a batch to a sink, retrying until written or stopped."""
+        delay = RETRY_DELAY
+        while True:
+            try:
+                await sink.async_write(batch)
+            except Exception as exception:  # noqa: BLE001 Any sink may fail
+                if self._stopping.is_set():
+                    LOGGER.error(  # noqa: TRY400 The traceback is of no use
+                        "Dropping %d frames for %s - %s",
+                        len(batch),
+                        type(sink).__name__,
+                        exception,
+                    )
+                    return
+                LOGGER.warning(
+                    "Writing to %s failed, retrying in %.0f s - %s",
+                    type(sink).__name__,
+                    delay,
+                    exception,
+                )
+                with suppress(TimeoutError):
+                    await asyncio.wait_for(self._stopping.wait(), delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+            else:
+                return
+
+
+async def async_collect(config: CollectorConfig) -> None:
+    """Run the collector until interrupted."""
+    collector = SMACollector(config)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, collector.stop)
+    await collector.async_run()
+
+
+def main() -> int:
+    """Run the collector from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="python3 -m collector",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("config", type=Path)
+    args = parser.parse_args()
+    try:
+        config = load_config(args.config)
+    except (OSError, TypeError, ValueError) as exception:
+        parser.error(str(exception))
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    asyncio.run(async_collect(config))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+"""Time-series sinks the collector writes batches of frames to."""
+
+from __future__ import annotations
+
+import asyncio
+import struct
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from yarl import URL
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    import aiohttp
+
+DEFAULT_MEASUREMENT = "smart_meter"
+DAY = 24 * 60 * 60
+
+# escaping of the line protocol, the measurement keeps "=" unescaped
+_KEY_ESCAPES = str.maketrans({",": r"\,", "=": r"\=", " ": r"\ "})
+_MEASUREMENT_ESCAPES = str.maketrans({",": r"\,", " ": r"\ "})
+
+
+@dataclass(slots=True)
+class CollectedFrame:
+    """Numeric values of a frame, keyed like the measurement slots."""
+
+    adapter: str
+    # meter time of the frame, or the receive time, in seconds
+    time: float
+    values: dict[str, float]
+
+
+class SMASink(ABC):
+    """A sink frames are written to in batches."""
+
+    async def async_open(  # noqa: B027 Only needed by some sinks
+        self, session: aiohttp.ClientSession
+    ) -> None:
+        """Prepare the sink, with the session for HTTP sinks."""
+
+    @abstractmethod
+    async def async_write(self, frames: Sequence[CollectedFrame]) -> None:
+        """Write a batch of frames, raise if it has to be retried."""
+
+    async def async_close(self) -> None:  # noqa: B027 Only needed by some sinks
+        """Flush and close the sink."""
+
+
+def _append(path: Path, body: bytes) -> None:
+    """Append to a file, blocking."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("ab") as file:
+        file.write(body)
+
+
+def influx_lines(measurement: str, frames: Sequence[CollectedFrame]) -> str:
+    """Return the frames in InfluxDB line protocol, with millisecond timestamps."""
+    measurement = measurement.translate(_MEASUREMENT_ESCAPES)
+    return "".join(
+        f"{measurement},adapter={frame.adapter.translate(_KEY_ESCAPES)} "
+        + ",".join(
+            f"{key.translate(_KEY_ESCAPES)}={value!r}"
+            for key, value in frame.values.items()
+        )
+        + f" {round(frame.time * 1000)}\n"
+        for frame in frames
+        if frame.values
+    )
+
+
+class InfluxSink(SMASink):
+    """
+    InfluxDB line protocol, appended to a file or posted to a write endpoint.
+
+    Every frame is one line tagged with the adapter, with a float field per
+    value. The URL is the full write endpoint, ``/api/v2/write`` with the
+    organization and bucket or ``/write`` with the database.
+    """
+
+    def __init__(
+        self,
+        *,
+        path: str | None = None,
+        url: str | None = None,
+        token: str | None = None,
+        measurement: str = DEFAULT_MEASUREMENT,
+    ) -> None:
+        """Initialize the sink."""
+        if (path is None) == (url is None):
+            msg = "The influx sink needs either a path or a url"
+            raise ValueError(msg)
+        self._path = Path(path) if path is not None else None
+        self._url = URL(url).update_query(precision="ms") if url is not None else None
+        self._headers = {"Content-Type": "text/plain; charset=utf-8"}
+        if token is not None:
+            self._headers["Authorization"] = f"Token {token}"
+        self._measurement = measurement
+        self._session: aiohttp.ClientSession | None = None
+
+    async def async_open(self, session: aiohttp.ClientSession) -> None:
+        """Keep the session to post the batches with."""
+        self._session = session
+
+    async def async_write(self, frames: Sequence[CollectedFrame]) -> None:
+        """Write a batch of frames."""
+        body = influx_lines(self._measurement, frames).encode()
+        if not body:
+            return
+        if self._path is not None:
+            await asyncio.to_thread(_append, self._path, body)
+            return
+        assert self._session is not None  # noqa: S101 Opened before the first write
+        async with self._session.post(
+            self._url, data=body, headers=self._headers
+        ) as response:
+            response.raise_for_status()
+
+
+def _varint(value: int) -> bytes:
+    """Encode a non-negative protobuf varint."""
+    out = bytearray()
+    while value > 0x7F:  # noqa: PLR2004 Largest single byte varint
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _message(number: int, payload: bytes) -> bytes:
+    """Encode a length delimited protobuf field."""
+    return _varint(number << 3 | 2) + _varint(len(payload)) + payload
+
+
+def _sample(value: float, timestamp: int) -> bytes:
+    """Encode a Sample message, a double value and an int64 timestamp."""
+    return b"\x09" + struct.pack("<d", value) + b"\x10" + _varint(timestamp)
+
+
+class PrometheusRemoteWriteSink(SMASink):
+    """
+    Prometheus remote-write, a snappy compressed protobuf WriteRequest.
+
+    Every value is a series of one metric, labeled with the adapter and the
+    key. The protobuf messages are encoded by hand, only the compression needs
+    the optional ``cramjam`` package.
+    """
+
+    def __init__(
+        self,
+        *,
+        url: str,
+        token: str | None = None,
+        metric: str = DEFAULT_MEASUREMENT,
+    ) -> None:
+        """Initialize the sink."""
+        from cramjam import snappy  # noqa: PLC0415 Optional dependency
+
+        self._compress = snappy.compress_raw
+        self._url = URL(url)
+        self._headers = {
+            "Content-Encoding": "snappy",
+            "Content-Type": "application/x-protobuf",
+            "X-Prometheus-Remote-Write-Version": "0.1.0",
+        }
+        if token is not None:
+            self._headers["Authorization"] = f"Bearer {token}"
+        self._metric = metric
+        # encoded labels of every series, sorted by label name
+        self._labels: dict[tuple[str, str], bytes] = {}
+        self._session: aiohttp.ClientSession | None = None
+
+    async def async_open(self, session: aiohttp.ClientSession) -> None:
+        """Keep the session to post the batches with."""
+        self._session = session
+
+    def _series_labels(self, adapter: str, key: str) -> bytes:
+        """Return the encoded labels of a series."""
+        if (labels := self._labels.get((adapter, key))) is None:
+            labels = self._labels[adapter, key] = b"".join(
+                _message(1, _message(1, name.encode()) + _message(2, value.encode()))
+                for name, value in (
+                    ("__name__", self._metric),
+                    ("adapter", adapter),
+                    ("key", key),
+                )
+            )
+        return labels
+
+    def encode(self, frames: Sequence[CollectedFrame]) -> bytes:
+        """Return the uncompressed WriteRequest of a batch."""
+        samples: dict[tuple[str, str], list[bytes]] = {}
+        for frame in frames:
+            timestamp = round(frame.time * 1000)
+            for key, value in frame.values.items():
+                samples.setdefault((frame.adapter, key), []).append(
+                    _message(2, _sample(value, timestamp))
+                )
+        return b"".join(
+            _message(1, self._series_labels(*series) + b"".join(encoded))
+            for series, encoded in samples.items()
+        )
+
+    async def async_write(self, frames: Sequence[CollectedFrame]) -> None:
+        """Write a batch of frames."""
+        if not (request := self.encode(frames)):
+            return
+        assert self._session is not None  # noqa: S101 Opened before the first write
+        async with self._session.post(
+            self._url, data=bytes(self._compress(request)), headers=self._headers
+        ) as response:
+            response.raise_for_status()
+
+
+class ParquetSink(SMASink):
+    """
+    Parquet files in long format, one row per value, one file per UTC day.
+
+    Every batch adds a row group to the file of each day it has frames of. The
+    meter clocks of the adapters differ, so a day is only closed once every
+    adapter has moved past it, or a day later for an adapter that went quiet.
+    A file is only complete once it is closed, on rotation or shutdown, so
+    every file is named after its first frame and a restart starts a new one.
+    Needs the optional ``pyarrow``.
+    """
+
+    def __init__(self, *, directory: str) -> None:
+        """Initialize the sink."""
+        import pyarrow as pa  # noqa: PLC0415 Optional dependency
+        import pyarrow.parquet as pq  # noqa: PLC0415 Optional dependency
+
+        self._pa = pa
+        self._pq = pq
+        self._directory = Path(directory)
+        self._schema = pa.schema(
+            [
+                ("time", pa.timestamp("ms", tz="UTC")),
+                ("adapter", pa.string()),
+                ("key", pa.string()),
+                ("value", pa.float64()),
+            ]
+        )
+        self._writers: dict[int, Any] = {}
+        # day of the latest frame of every adapter
+        self._adapter_days: dict[str, int] = {}
+
+    def _write(self, frames: Sequence[CollectedFrame]) -> None:
+        """Write a batch of frames, blocking."""
+        days: dict[int, dict[str, list[Any]]] = {}
+        for frame in frames:
+            day = int(frame.time // DAY)
+            self._adapter_days[frame.adapter] = max(
+                day, self._adapter_days.get(frame.adapter, day)
+            )
+            if (columns := days.get(day)) is None:
+                columns = days[day] = {name: [] for name in self._schema.names}
+            timestamp = round(frame.time * 1000)
+            for key, value in frame.values.items():
+                columns["time"].append(timestamp)
+                columns["adapter"].append(frame.adapter)
+                columns["key"].append(key)
+                columns["value"].append(value)
+        for day, columns in sorted(days.items()):
+            if columns["time"]:
+                self._write_rows(day, columns)
+
+        if self._adapter_days:
+            # every adapter moved past it, or a quiet one is a day behind
+            done = max(
+                min(self._adapter_days.values()), max(self._adapter_days.values()) - 1
+            )
+            for day in [day for day in self._writers if day < done]:
+                self._writers.pop(day).close()
+
+    def _write_rows(self, day: int, columns: dict[str, list[Any]]) -> None:
+        """Write rows of one day as a row group of its file, blocking."""
+        if (writer := self._writers.get(day)) is None:
+            self._directory.mkdir(parents=True, exist_ok=True)
+            start = datetime.fromtimestamp(min(columns["time"]) / 1000, UTC)
+            path = self._directory / f"frames-{start:%Y%m%dT%H%M%S}.parquet"
+            index = 1
+            while path.exists():
+                # never overwrite a file, like one of a restart in the same second
+                path = path.with_name(f"frames-{start:%Y%m%dT%H%M%S}-{index}.parquet")
+                index += 1
+            writer = self._writers[day] = self._pq.ParquetWriter(path, self._schema)
+        writer.write_table(self._pa.Table.from_pydict(columns, schema=self._schema))
+
+    def _close(self) -> None:
+        """Close the open files, blocking."""
+        while self._writers:
+            self._writers.popitem()[1].close()
+
+    async def async_write(self, frames: Sequence[CollectedFrame]) -> None:
+        """Write a batch of frames."""
+        await asyncio.to_thread(self._write, frames)
+
+    async def async_close(self) -> None:
+        """Close the open files."""
+        await asyncio.to_thread(self._close)
+
+
+SINKS: dict[str, type[SMASink]] = {
+    "influx": InfluxSink,
+    "prometheus": PrometheusRemoteWriteSink,
+    "parquet": ParquetSink,
+}
+
+
+def create_sink(config: dict[str, Any]) -> SMASink:
+    """Create a sink from its configuration table."""
+    options = dict(config)
+    kind = options.pop("type", None)
+    if kind not in SINKS:
+        msg = f"Unknown sink type {kind!r}, expected one of {', '.join(SINKS)}"
+        raise ValueError(msg)
+    return SINKS[kind](**options)
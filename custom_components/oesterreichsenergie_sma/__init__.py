@@ -7,25 +7,56 @@ https://github.com/DavidProdinger/ha-oesterreichsenergie
 
 from __future__ import annotations
 
+import asyncio
 from datetime import timedelta
+from functools import partial
+from pathlib import Path
 from typing import TYPE_CHECKING
 
-from homeassistant.const import CONF_HOST, CONF_TOKEN, CONF_VERIFY_SSL, Platform
+from homeassistant.const import (
+    CONF_HOST,
+    CONF_TOKEN,
+    CONF_VERIFY_SSL,
+    EVENT_HOMEASSISTANT_FINAL_WRITE,
+    Platform,
+)
+from homeassistant.core import callback
+from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers import device_registry as dr
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.typing import UNDEFINED
 from homeassistant.loader import async_get_loaded_integration
 
+# The modules are imported with the integration in the executor. The
+# coordinator needs statistics and demand for every frame anyway, capture and
+# services take below a millisecond, importing them in the setup functions
+# would block the event loop instead.
 from .api import SMAApiClient
-from .const import DOMAIN, LOGGER
+from .capture import SMACaptureWriter
+from .const import (
+    CAPTURE_FLUSH_INTERVAL,
+    CONF_CAPTURE,
+    CONF_MQTT_TOPIC,
+    DOMAIN,
+    LOGGER,
+)
 from .coordinator import (
     SMAMeasurementDataUpdateCoordinator,
     SMAStatusDataUpdateCoordinator,
+    status_store,
 )
 from .data import SMAData
+from .demand import SMADemandTracker
+from .hub import async_get_hub
 from .obis import get_meter_number
+from .services import async_setup_services
+from .statistics import SMACounterStatistics
 
 if TYPE_CHECKING:
-    from homeassistant.core import HomeAssistant
+    from datetime import datetime
+
+    from homeassistant.core import Event, HomeAssistant
+    from homeassistant.helpers.typing import ConfigType
 
     from .data import SMAConfigEntry
 
@@ -33,6 +64,14 @@ PLATFORMS: list[Platform] = [
     Platform.SENSOR,
 ]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:  # noqa: ARG001 Unused function argument: `config`
+    """Register the services, they are shared by all config entries."""
+    async_setup_services(hass)
+    return True
+
 
 # https://developers.home-assistant.io/docs/config_entries_index/#setting-up-an-entry
 async def async_setup_entry(
@@ -43,40 +82,125 @@ async def async_setup_entry(
     measurement_coordinator = SMAMeasurementDataUpdateCoordinator(
         hass=hass,
         logger=LOGGER,
+        config_entry=entry,
         name=DOMAIN,
         update_interval=timedelta(seconds=15),
     )
     status_coordinator = SMAStatusDataUpdateCoordinator(
         hass=hass,
         logger=LOGGER,
+        config_entry=entry,
         name=DOMAIN,
         update_interval=timedelta(hours=1),
     )
 
+    # all adapters share one connection pool and poll schedule
+    hub = async_get_hub(hass)
     entry.runtime_data = SMAData(
         client=SMAApiClient(
             host=entry.data[CONF_HOST],
             token=entry.data[CONF_TOKEN],
-            session=async_get_clientsession(
-                hass, verify_ssl=entry.data[CONF_VERIFY_SSL]
-            ),
+            session=hub.session,
+            verify_ssl=entry.data[CONF_VERIFY_SSL],
+            semaphore=hub.semaphore,
         ),
         integration=async_get_loaded_integration(hass, entry.domain),
         measurement_coordinator=measurement_coordinator,
         status_coordinator=status_coordinator,
     )
 
-    # https://developers.home-assistant.io/docs/integration_fetching_data#coordinated-single-api-poll-for-data-for-all-entities
-    await measurement_coordinator.async_config_entry_first_refresh()
-    await status_coordinator.async_config_entry_first_refresh()
+    hub.async_register(entry, measurement_coordinator.scheduler)
+    entry.async_on_unload(partial(hub.async_unregister, entry))
+
+    if entry.options.get(CONF_CAPTURE):
+        _async_start_capture(hass, entry)
+
+    await asyncio.gather(
+        measurement_coordinator.async_load(), status_coordinator.async_load()
+    )
+    if status_coordinator.data is None:
+        # the devices need the status of an adapter set up for the first time
+        # https://developers.home-assistant.io/docs/integration_fetching_data#coordinated-single-api-poll-for-data-for-all-entities
+        await asyncio.gather(
+            measurement_coordinator.async_config_entry_first_refresh(),
+            status_coordinator.async_config_entry_first_refresh(),
+        )
+    else:
+        # serve the stored status and the restored states while the adapter is
+        # asked, so a slow adapter does not delay the start of Home Assistant
+        entry.async_create_background_task(
+            hass,
+            _async_first_refresh(hass, entry),
+            name=f"{DOMAIN} - {entry.title} - first refresh",
+        )
+
+    # push measurements via MQTT, polling stays active as fallback
+    if mqtt_topic := entry.options.get(CONF_MQTT_TOPIC):
+        await measurement_coordinator.async_subscribe_mqtt(mqtt_topic)
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     entry.async_on_unload(entry.add_update_listener(async_reload_entry))
 
-    # create devices
+    _async_update_devices(hass, entry)
+    entry.async_on_unload(
+        status_coordinator.async_add_listener(
+            partial(_async_update_devices, hass, entry)
+        )
+    )
+
+    return True
+
+
+@callback
+def _async_start_capture(
+    hass: HomeAssistant,
+    entry: SMAConfigEntry,
+) -> None:
+    """Capture the raw adapter responses until the entry is unloaded."""
+    capture = SMACaptureWriter(
+        Path(hass.config.path(DOMAIN, f"capture-{entry.entry_id}.jsonl.gz"))
+    )
+    entry.runtime_data.client.capture = capture
+
+    async def _async_flush(_: datetime | Event | None = None) -> None:
+        await hass.async_add_executor_job(capture.flush)
+
+    entry.async_on_unload(
+        async_track_time_interval(
+            hass,
+            _async_flush,
+            timedelta(seconds=CAPTURE_FLUSH_INTERVAL),
+            cancel_on_shutdown=True,
+        )
+    )
+    entry.async_on_unload(
+        hass.bus.async_listen(EVENT_HOMEASSISTANT_FINAL_WRITE, _async_flush)
+    )
+    entry.async_on_unload(_async_flush)
+
+
+async def _async_first_refresh(
+    hass: HomeAssistant,
+    entry: SMAConfigEntry,
+) -> None:
+    """Revalidate the stored status and fetch the first measurement."""
+    await asyncio.gather(
+        entry.runtime_data.measurement_coordinator.async_refresh(),
+        entry.runtime_data.status_coordinator.async_refresh(),
+    )
+    _async_update_devices(hass, entry)
+
+
+@callback
+def _async_update_devices(
+    hass: HomeAssistant,
+    entry: SMAConfigEntry,
+) -> None:
+    """Create or update the devices from the adapter status."""
+    adapter = entry.runtime_data.status_coordinator.data
+    measurement = entry.runtime_data.measurement_coordinator.data
     device_registry = dr.async_get(hass)
     # adapter
-    adapter = status_coordinator.data
     device_registry.async_get_or_create(
         config_entry_id=entry.entry_id,
         entry_type=dr.DeviceEntryType.SERVICE,
@@ -91,7 +215,7 @@ async def async_setup_entry(
         configuration_url=entry.data[CONF_HOST],
     )
     # meter
-    meter = status_coordinator.data["meter"]
+    meter = adapter["meter"]
     device_registry.async_get_or_create(
         config_entry_id=entry.entry_id,
         identifiers={(entry.domain, f"{entry.entry_id}-meter")},
@@ -99,12 +223,13 @@ async def async_setup_entry(
         model=meter["supplier"],
         model_id=meter["supplier_id"],
         manufacturer=f"{meter['manufacturer']} {meter['name']}",
-        serial_number=get_meter_number(measurement_coordinator.data),
+        # keep the known serial number until the first frame arrived
+        serial_number=UNDEFINED
+        if measurement is None
+        else get_meter_number(measurement),
         via_device=(entry.domain, f"{entry.entry_id}-sma"),
     )
 
-    return True
-
 
 async def async_unload_entry(
     hass: HomeAssistant,
@@ -114,6 +239,16 @@ async def async_unload_entry(
     return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
 
 
+async def async_remove_entry(
+    hass: HomeAssistant,
+    entry: SMAConfigEntry,
+) -> None:
+    """Remove the stored data of an entry."""
+    await SMACounterStatistics(hass, entry).async_remove()
+    await SMADemandTracker(hass, entry).async_remove()
+    await status_store(hass, entry).async_remove()
+
+
 async def async_reload_entry(
     hass: HomeAssistant,
     entry: SMAConfigEntry,
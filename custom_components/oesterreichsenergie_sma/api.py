@@ -1,11 +1,42 @@
 """Module for the Smart Meter Adapter JSON API client."""
 
+import asyncio
+import random
 import socket
+from functools import partial
 from http import HTTPStatus
-from typing import Any
+from time import monotonic, time
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any
 
 import aiohttp
 import async_timeout
+from yarl import URL
+
+from .metrics import SMAClientMetrics
+
+if TYPE_CHECKING:
+    from .capture import SMACaptureWriter
+
+try:
+    # decodes the raw body without creating an intermediate str
+    from orjson import loads as json_loads
+except ImportError:  # pragma: no cover
+    from json import loads as json_loads
+
+MEASUREMENT_ENDPOINT = "measurement.json"
+STATUS_ENDPOINT = "status.json"
+
+# Seconds a response is handed to further callers. Measurements are never
+# reused, every poll wants the latest frame, concurrent polls share a request.
+RESPONSE_TTLS = {STATUS_ENDPOINT: 10.0}
+# Consecutive requests without a response before the circuit breaker opens
+BREAKER_THRESHOLD = 3
+# Seconds the breaker stays open at first, doubled with every failed probe
+BREAKER_BASE_DELAY = 5.0
+BREAKER_MAX_DELAY = 300.0
+# Seconds a request may take in total
+REQUEST_TIMEOUT = 10.0
 
 
 class SMAApiClientError(Exception):
@@ -20,6 +51,54 @@ class SMAApiClientAuthenticationError(SMAApiClientError):
     """Exception to indicate an authentication error."""
 
 
+class SMACircuitBreaker:
+    """
+    Stop requesting an unreachable adapter for a growing, jittered period.
+
+    After ``BREAKER_THRESHOLD`` consecutive requests without any response, on
+    a timeout or connection error, the breaker opens and requests fail at once
+    instead of waiting for the timeout. Error responses keep it closed. Once
+    the period is over, the next request probes the adapter. A response closes
+    the breaker again, another failure doubles the period up to
+    ``BREAKER_MAX_DELAY``. The jitter keeps adapters that failed together from
+    being probed together.
+    """
+
+    __slots__ = ("failures", "open_until")
+
+    def __init__(self) -> None:
+        """Initialize the closed breaker."""
+        self.failures = 0
+        self.open_until = 0.0
+
+    def retry_in(self, now: float) -> float:
+        """Return the seconds until requests are allowed again, 0 if they are."""
+        return max(self.open_until - now, 0.0)
+
+    def record_response(self) -> None:
+        """Close the breaker, the adapter responded."""
+        self.failures = 0
+        self.open_until = 0.0
+
+    def record_failure(self, now: float) -> None:
+        """Record a request without response, opening after the threshold."""
+        self.failures += 1
+        if self.failures < BREAKER_THRESHOLD:
+            return
+        doublings = min(self.failures - BREAKER_THRESHOLD, 16)
+        delay = min(BREAKER_BASE_DELAY * 2**doublings, BREAKER_MAX_DELAY)
+        jitter = random.uniform(0.5, 1.0)  # noqa: S311 Not used for cryptography
+        self.open_until = now + delay * jitter
+
+
+def _is_unreachable(exception: SMAApiClientError) -> bool:
+    """Return if a request failed without any response of the adapter."""
+    return isinstance(
+        exception.__cause__,
+        TimeoutError | aiohttp.ClientConnectionError | socket.gaierror,
+    )
+
+
 def _verify_response_or_raise(response: aiohttp.ClientResponse) -> None:
     """Verify that the response is valid."""
     if response.status in (HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN):
@@ -31,47 +110,185 @@ def _verify_response_or_raise(response: aiohttp.ClientResponse) -> None:
     response.raise_for_status()
 
 
+async def _on_connection_create_end(
+    _session: aiohttp.ClientSession,
+    context: SimpleNamespace,
+    _params: aiohttp.TraceConnectionCreateEndParams,
+) -> None:
+    """Count a new connection, including its TLS handshake."""
+    if isinstance(metrics := context.trace_request_ctx, SMAClientMetrics):
+        metrics.connections += 1
+
+
+async def _on_connection_reuseconn(
+    _session: aiohttp.ClientSession,
+    context: SimpleNamespace,
+    _params: aiohttp.TraceConnectionReuseconnParams,
+) -> None:
+    """Count a request served by a kept-alive connection."""
+    if isinstance(metrics := context.trace_request_ctx, SMAClientMetrics):
+        metrics.reused_connections += 1
+
+
+def create_trace_config() -> aiohttp.TraceConfig:
+    """Return a trace config counting new and reused connections per client."""
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_create_end.append(_on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(_on_connection_reuseconn)
+    return trace_config
+
+
 class SMAApiClient:
     """Client for the Smart Meter Adapter."""
 
-    def __init__(
+    def __init__(  # noqa: PLR0913 Too many arguments in function definition
         self,
         host: str,
         token: str,
         session: aiohttp.ClientSession,
         version: str = "v1",
+        *,
+        verify_ssl: bool = True,
+        semaphore: asyncio.Semaphore | None = None,
+        timeout: float = REQUEST_TIMEOUT,
+        connect_timeout: float | None = None,
     ) -> None:
         """Initialize the client."""
-        self._host = host
-        self._token = token
         self._session = session
-        self._version = version
+        self._verify_ssl = verify_ssl
+        self._timeout = timeout
+        # a short connect timeout fails fast on hosts that do not exist
+        self._client_timeout = (
+            aiohttp.ClientTimeout(sock_connect=connect_timeout)
+            if connect_timeout is not None
+            else session.timeout
+        )
+        # limits the requests in flight across clients sharing the semaphore
+        self._semaphore = semaphore
+        self.metrics = SMAClientMetrics()
+        self.breaker = SMACircuitBreaker()
+        # request of every endpoint shared by concurrent callers
+        self._in_flight: dict[str, asyncio.Task[Any]] = {}
+        # receive time and decoded body of the last response of every endpoint
+        self._responses: dict[str, tuple[float, Any]] = {}
+        # records the raw responses while a capture is running
+        self.capture: SMACaptureWriter | None = None
+        # request templates, built once instead of on every poll
+        self._urls = {
+            endpoint: URL(f"{host}/api/{version}/{endpoint}")
+            for endpoint in (MEASUREMENT_ENDPOINT, STATUS_ENDPOINT)
+        }
+        self._headers = {
+            "Authorization": f"TOKEN {token}",
+            "Content-Type": "application/json",
+        }
 
     async def async_get_measurement(self) -> Any:
         """Get the current measurements from the Smart Meter."""
-        return await self._get_data(endpoint="measurement.json")
+        return await self._get_data(endpoint=MEASUREMENT_ENDPOINT)
 
     async def async_get_status(self) -> Any:
         """Get the status of the Smart Meter Adapter."""
-        return await self._get_data(endpoint="status.json")
+        return await self._get_data(endpoint=STATUS_ENDPOINT)
 
     async def _get_data(
         self,
         endpoint: str,
     ) -> Any:
-        """Call the JSON API."""
+        """
+        Return a fresh response, sharing one request among concurrent callers.
+
+        The decoded body is shared as well, so callers must not modify it.
+        """
+        now = monotonic()
+        response = self._responses.get(endpoint)
+        if response is not None and now - response[0] < RESPONSE_TTLS[endpoint]:
+            return response[1]
+        if (task := self._in_flight.get(endpoint)) is None:
+            if retry_in := self.breaker.retry_in(now):
+                self.metrics.rejected += 1
+                msg = f"Adapter unreachable, retrying in {retry_in:.0f} s"
+                raise SMAApiClientCommunicationError(msg)
+            task = self._in_flight[endpoint] = asyncio.create_task(
+                self._fetch(endpoint), name=f"Smart Meter Adapter request {endpoint}"
+            )
+            task.add_done_callback(partial(self._fetched, endpoint))
+        # a cancelled caller leaves the request running for the others
+        return await asyncio.shield(task)
+
+    def _fetched(self, endpoint: str, task: asyncio.Task[Any]) -> None:
+        """Keep the response of a finished request for the TTL."""
+        del self._in_flight[endpoint]
+        if (
+            not task.cancelled()
+            and task.exception() is None
+            and RESPONSE_TTLS.get(endpoint)
+        ):
+            self._responses[endpoint] = (monotonic(), task.result())
+
+    async def _fetch(
+        self,
+        endpoint: str,
+    ) -> Any:
+        """Call the JSON API and record the request metrics."""
+        start = monotonic()
+        deadline = asyncio.get_running_loop().time() + self._timeout
+        if self._semaphore is not None:
+            # waiting for a slot counts against the timeout and the latency
+            try:
+                async with async_timeout.timeout_at(deadline):
+                    await self._semaphore.acquire()
+            except TimeoutError:
+                # the adapter was not asked, the breaker stays as it is
+                self.metrics.record_error(timeout=True)
+                msg = "Timeout waiting for the requests to other adapters"
+                raise SMAApiClientCommunicationError(msg) from None
         try:
-            async with async_timeout.timeout(10):
-                response = await self._session.get(
-                    url=f"{self._host}/api/{self._version}/{endpoint}",
-                    headers={
-                        "Authorization": f"TOKEN {self._token}",
-                        "Content-Type": "application/json",
-                    },
-                )
+            data = await self._request(endpoint, deadline)
+        except SMAApiClientError as exception:
+            if _is_unreachable(exception):
+                self.breaker.record_failure(monotonic())
+            else:
+                self.breaker.record_response()
+            self.metrics.record_error(
+                timeout=isinstance(exception.__cause__, TimeoutError),
+                auth=isinstance(exception, SMAApiClientAuthenticationError),
+            )
+            raise
+        finally:
+            if self._semaphore is not None:
+                self._semaphore.release()
+        self.breaker.record_response()
+        self.metrics.record(monotonic() - start)
+        return data
+
+    async def _request(
+        self,
+        endpoint: str,
+        deadline: float,
+    ) -> Any:
+        """Call the JSON API, until the deadline in loop time."""
+        try:
+            async with (
+                async_timeout.timeout_at(deadline),
+                self._session.get(
+                    url=self._urls[endpoint],
+                    headers=self._headers,
+                    ssl=self._verify_ssl,
+                    timeout=self._client_timeout,
+                    trace_request_ctx=self.metrics,
+                ) as response,
+            ):
                 _verify_response_or_raise(response)
-                return await response.json()
+                body = await response.read()
+                self.metrics.payload_sizes[endpoint] = len(body)
+                if self.capture is not None:
+                    self.capture.record(time(), endpoint, body)
+                return json_loads(body)
 
+        except SMAApiClientError:
+            # authentication and not found errors of the response
+            raise
         except TimeoutError as exception:
             msg = f"Timeout error fetching information - {exception}"
             raise SMAApiClientCommunicationError(
@@ -82,6 +299,11 @@ class SMAApiClient:
             raise SMAApiClientCommunicationError(
                 msg,
             ) from exception
+        except ValueError as exception:
+            msg = f"Invalid JSON received - {exception}"
+            raise SMAApiClientError(
+                msg,
+            ) from exception
         except Exception as exception:  # pylint: disable=broad-except
             msg = f"Error with the API client! - {exception}"
             raise SMAApiClientError(
@@ -0,0 +1,111 @@
+"""High resolution sample buffer of the Smart Meter measurements."""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import pairwise
+from math import fsum, isnan, nan
+from typing import TYPE_CHECKING
+
+from .obis import OBIS_SLOTS, OBIS_UNITS
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from .measurement import SMAMeasurement
+
+# Slots of the numeric registers which are buffered
+BUFFER_SLOTS = tuple(OBIS_SLOTS[key] for key in OBIS_UNITS)
+
+
+class SMAMeasurementBuffer:
+    """
+    Fixed size ring buffer of full-rate samples per OBIS channel.
+
+    All channels share one time axis, a channel is allocated when the register
+    first shows up with a numeric value. Missing samples are stored as NaN.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """Initialize the buffer with room for ``capacity`` frames."""
+        self.capacity = capacity
+        self.size = 0
+        self.times = array("d", [nan]) * capacity
+        self.channels: dict[int, array[float]] = {}
+        self._head = 0
+
+    def append(self, time: float, data: SMAMeasurement) -> None:
+        """Append the numeric registers of a frame."""
+        head = self._head
+        self.times[head] = time
+        values = data.values
+        for slot in BUFFER_SLOTS:
+            value = values[slot]
+            channel = self.channels.get(slot)
+            if not isinstance(value, int | float):
+                if channel is not None:
+                    channel[head] = nan
+                continue
+            if channel is None:
+                channel = self.channels[slot] = array("d", [nan]) * self.capacity
+            channel[head] = value
+
+        self._head = (head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def _ordered(self, column: array[float]) -> array[float]:
+        """Return a column from the oldest to the newest sample."""
+        if self.size < self.capacity:
+            return column[: self.size]
+        return column[self._head :] + column[: self._head]
+
+    def columns(
+        self,
+        slots: Iterable[int],
+        start: float | None = None,
+        end: float | None = None,
+    ) -> tuple[array[float], dict[int, array[float]]]:
+        """Return the shared times and the values of channels within a time range."""
+        times = self._ordered(self.times)
+        first = 0 if start is None else bisect_left(times, start)
+        last = len(times) if end is None else bisect_right(times, end)
+        columns = {}
+        for slot in slots:
+            channel = self.channels.get(slot)
+            columns[slot] = (
+                self._ordered(channel)[first:last]
+                if channel is not None
+                else array("d", [nan]) * (last - first)
+            )
+        return times[first:last], columns
+
+
+def downsample(
+    times: array[float],
+    columns: dict[int, array[float]],
+    resolution: float,
+) -> tuple[array[float], dict[int, array[float]]]:
+    """
+    Return the mean of every column per bucket of ``resolution`` seconds.
+
+    The buckets are aligned to the epoch and named by their start, missing
+    samples are left out of the mean and a bucket without any is NaN.
+    """
+    starts = array("d")
+    bounds = []
+    bucket = None
+    for index, time in enumerate(times):
+        if (current := time // resolution) != bucket:
+            bucket = current
+            starts.append(current * resolution)
+            bounds.append(index)
+    bounds.append(len(times))
+
+    means = {}
+    for slot, column in columns.items():
+        means[slot] = mean = array("d")
+        for first, last in pairwise(bounds):
+            values = [value for value in column[first:last] if not isnan(value)]
+            mean.append(fsum(values) / len(values) if values else nan)
+    return starts, means
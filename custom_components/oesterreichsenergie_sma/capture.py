@@ -0,0 +1,51 @@
+"""Capture of the raw Smart Meter Adapter responses, for an offline replay."""
+
+from __future__ import annotations
+
+import gzip
+import json
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+
+class SMACaptureWriter:
+    """
+    Append-only capture of the adapter responses, one JSON line per response.
+
+    Every record holds the receive time, the endpoint and the raw body. The
+    records are kept in memory and appended to the file as a new gzip member
+    on every flush, so a capture interrupted by a restart stays readable and
+    is simply continued.
+    """
+
+    __slots__ = ("_pending", "path")
+
+    def __init__(self, path: Path) -> None:
+        """Initialize the capture."""
+        self.path = path
+        self._pending: list[bytes] = []
+
+    def record(self, time: float, endpoint: str, body: bytes) -> None:
+        """Record a response."""
+        record = {"time": time, "endpoint": endpoint, "body": body.decode()}
+        self._pending.append(json.dumps(record).encode() + b"\n")
+
+    def flush(self) -> None:
+        """Append the recorded responses to the file, blocking."""
+        if not self._pending:
+            return
+        lines, self._pending = self._pending, []
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(self.path, "ab") as file:
+            file.writelines(lines)
+
+
+def read_capture(path: Path) -> Iterator[tuple[float, str, bytes]]:
+    """Yield time, endpoint and body of the captured responses, blocking."""
+    with gzip.open(path, "rb") as file:
+        for line in file:
+            record = json.loads(line)
+            yield record["time"], record["endpoint"], record["body"].encode()
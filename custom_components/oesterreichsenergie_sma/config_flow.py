@@ -1,17 +1,29 @@
 """Configuration flow for Smart Meter Adapter."""
 
-from typing import Any
+from __future__ import annotations
 
+from ipaddress import ip_address, ip_network
+from typing import TYPE_CHECKING, Any
+
+import aiohttp
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.const import CONF_HOST, CONF_TOKEN, CONF_VERIFY_SSL
-from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.core import callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.device_registry import format_mac
 from homeassistant.helpers.selector import (
+    BooleanSelector,
+    NumberSelector,
+    NumberSelectorConfig,
+    NumberSelectorMode,
     TextSelector,
     TextSelectorConfig,
     TextSelectorType,
 )
 from homeassistant.util import slugify
+from homeassistant.util.ssl import get_default_context
+from yarl import URL
 
 from .api import (
     SMAApiClient,
@@ -19,7 +31,23 @@ from .api import (
     SMAApiClientCommunicationError,
     SMAApiClientError,
 )
-from .const import DOMAIN, LOGGER
+from .const import (
+    CONF_CAPTURE,
+    CONF_DEMAND_LIMIT,
+    CONF_MQTT_TOPIC,
+    CONF_SUBNET,
+    CONF_WRITE_INTERVAL,
+    DOMAIN,
+    LOGGER,
+    SCAN_CONCURRENCY,
+    SCAN_MAX_HOSTS,
+)
+from .discovery import SMAScanResult, adapter_title, adapter_unique_id, async_scan
+
+if TYPE_CHECKING:
+    import asyncio
+
+    from homeassistant.helpers.service_info.dhcp import DhcpServiceInfo
 
 DATA_SCHEMA_SETUP = vol.Schema(
     {
@@ -32,6 +60,38 @@ DATA_SCHEMA_SETUP = vol.Schema(
         ),
     }
 )
+DATA_SCHEMA_CREDENTIALS = vol.Schema(
+    {
+        vol.Required(CONF_VERIFY_SSL, default=False): bool,
+        vol.Required(CONF_TOKEN): TextSelector(
+            TextSelectorConfig(type=TextSelectorType.PASSWORD)
+        ),
+    }
+)
+DATA_SCHEMA_SCAN = vol.Schema(
+    {
+        vol.Required(CONF_SUBNET): TextSelector(),
+        vol.Required(CONF_VERIFY_SSL, default=False): bool,
+        vol.Required(CONF_TOKEN): TextSelector(
+            TextSelectorConfig(type=TextSelectorType.PASSWORD)
+        ),
+    }
+)
+
+
+def _ip_host(ip: str) -> str:
+    """Return the host of an address, IPv6 addresses in brackets."""
+    return str(URL.build(scheme="https", host=ip))
+
+
+def _updated_host(host: str, ip: str) -> str | None:
+    """Return the host with a new address, None if it is configured by name."""
+    url = URL(host)
+    try:
+        ip_address(url.host or "")
+    except ValueError:
+        return None
+    return str(url.with_host(ip))
 
 
 class SMAConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -39,11 +99,33 @@ class SMAConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    def __init__(self) -> None:
+        """Initialize the flow."""
+        # host of a discovered adapter, waiting for its token
+        self._host: str | None = None
+        self._scan_input: dict[str, Any] = {}
+        self._scan_task: asyncio.Task[SMAScanResult] | None = None
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,  # noqa: ARG004 Unused static method argument: `config_entry`
+    ) -> config_entries.OptionsFlow:
+        """Get the options flow for this handler."""
+        return SMAOptionsFlow()
+
     async def async_step_user(
-        self, user_input: dict[str, Any] | None = None
+        self,
+        user_input: dict[str, Any] | None = None,  # noqa: ARG002 Only a menu
     ) -> config_entries.ConfigFlowResult:
         """Handle a flow initialized by the user."""
-        _errors = {}
+        return self.async_show_menu(step_id="user", menu_options=["manual", "scan"])
+
+    async def async_step_manual(
+        self, user_input: dict[str, Any] | None = None
+    ) -> config_entries.ConfigFlowResult:
+        """Set up an adapter by its host."""
+        _errors: dict[str, str] = {}
         if user_input is not None:
             # prepend https:// if missing
             if not user_input[CONF_HOST].startswith("http"):
@@ -51,41 +133,200 @@ class SMAConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
             user_input[CONF_HOST] = user_input[CONF_HOST].strip("/")
 
+            if result := await self._async_create_entry_or_errors(user_input, _errors):
+                return result
+
+        return self.async_show_form(
+            step_id="manual",
+            data_schema=DATA_SCHEMA_SETUP,
+            errors=_errors,
+        )
+
+    async def async_step_dhcp(
+        self, discovery_info: DhcpServiceInfo
+    ) -> config_entries.ConfigFlowResult:
+        """Handle an adapter discovered by its DHCP request."""
+        entry = await self.async_set_unique_id(
+            slugify(format_mac(discovery_info.macaddress))
+        )
+        if entry is not None and (
+            host := _updated_host(entry.data[CONF_HOST], discovery_info.ip)
+        ):
+            # follow a new address of a configured adapter
+            self._abort_if_unique_id_configured(updates={CONF_HOST: host})
+        self._abort_if_unique_id_configured()
+
+        self._host = _ip_host(discovery_info.ip)
+        self.context["title_placeholders"] = {"name": discovery_info.hostname}
+        return await self.async_step_discovery_confirm()
+
+    async def async_step_discovery_confirm(
+        self, user_input: dict[str, Any] | None = None
+    ) -> config_entries.ConfigFlowResult:
+        """Ask for the token of a discovered adapter."""
+        assert self._host is not None  # noqa: S101 Set by the discovery step
+        _errors: dict[str, str] = {}
+        if user_input is not None:
+            user_input = {CONF_HOST: self._host, **user_input}
+            if result := await self._async_create_entry_or_errors(user_input, _errors):
+                return result
+
+        return self.async_show_form(
+            step_id="discovery_confirm",
+            data_schema=DATA_SCHEMA_CREDENTIALS,
+            errors=_errors,
+            description_placeholders={"host": self._host},
+        )
+
+    async def async_step_scan(
+        self, user_input: dict[str, Any] | None = None
+    ) -> config_entries.ConfigFlowResult:
+        """Ask for a subnet to scan for adapters sharing a token."""
+        _errors: dict[str, str] = {}
+        if user_input is not None:
             try:
-                status = await self._get_status(
-                    host=user_input[CONF_HOST],
-                    verify_ssl=user_input[CONF_VERIFY_SSL],
-                    token=user_input[CONF_TOKEN],
-                )
-            except SMAApiClientAuthenticationError as exception:
-                LOGGER.warning(exception)
-                _errors["base"] = "auth"
-            except SMAApiClientCommunicationError as exception:
-                LOGGER.warning(exception)
-                _errors["base"] = "connection"
-            except SMAApiClientError as exception:
-                LOGGER.warning(exception)
-                _errors["base"] = "unknown"
+                network = ip_network(user_input[CONF_SUBNET].strip(), strict=False)
+            except ValueError:
+                _errors[CONF_SUBNET] = "invalid_subnet"
             else:
-                await self.async_set_unique_id(
-                    unique_id=slugify(
-                        status["wifi"]["mac"] or status["name"] or user_input[CONF_HOST]
-                    )
-                )
-                self._abort_if_unique_id_configured()
-
-                return self.async_create_entry(
-                    title=status["name"]
-                    or f"Smart Meter Adapter - {user_input[CONF_HOST]}",
-                    data=user_input,
-                )
+                if network.num_addresses > SCAN_MAX_HOSTS:
+                    _errors[CONF_SUBNET] = "subnet_too_large"
+                else:
+                    self._scan_input = {**user_input, CONF_SUBNET: str(network)}
+                    return await self.async_step_scan_progress()
 
         return self.async_show_form(
-            step_id="user",
-            data_schema=DATA_SCHEMA_SETUP,
+            step_id="scan",
+            data_schema=self.add_suggested_values_to_schema(
+                DATA_SCHEMA_SCAN, user_input
+            ),
             errors=_errors,
+            description_placeholders={"max_hosts": str(SCAN_MAX_HOSTS)},
         )
 
+    async def async_step_scan_progress(
+        self,
+        user_input: dict[str, Any] | None = None,  # noqa: ARG002 Progress step
+    ) -> config_entries.ConfigFlowResult:
+        """Scan the subnet in the background."""
+        if self._scan_task is None:
+            self._scan_task = self.hass.async_create_task(
+                self._async_scan(), "Smart Meter Adapter subnet scan"
+            )
+        if not self._scan_task.done():
+            return self.async_show_progress(
+                step_id="scan_progress",
+                progress_action="scan",
+                progress_task=self._scan_task,
+                description_placeholders={CONF_SUBNET: self._scan_input[CONF_SUBNET]},
+            )
+        return self.async_show_progress_done(next_step_id="scan_done")
+
+    async def async_step_scan_done(
+        self,
+        user_input: dict[str, Any] | None = None,  # noqa: ARG002 Final step
+    ) -> config_entries.ConfigFlowResult:
+        """Set up every adapter found, each in its own flow."""
+        assert self._scan_task is not None  # noqa: S101 Set by the progress step
+        result = self._scan_task.result()
+        for adapter in result.adapters.values():
+            self.hass.async_create_task(
+                self.hass.config_entries.flow.async_init(
+                    DOMAIN,
+                    context={"source": config_entries.SOURCE_INTEGRATION_DISCOVERY},
+                    data={
+                        CONF_HOST: adapter.host,
+                        CONF_TOKEN: self._scan_input[CONF_TOKEN],
+                        CONF_VERIFY_SSL: self._scan_input[CONF_VERIFY_SSL],
+                        "unique_id": adapter.unique_id,
+                        "title": adapter.title,
+                    },
+                ),
+                f"Smart Meter Adapter discovery {adapter.host}",
+            )
+        return self.async_abort(
+            reason="scan_complete",
+            description_placeholders={
+                "found": str(len(result.adapters)),
+                "unauthorized": str(len(result.unauthorized)),
+            },
+        )
+
+    async def async_step_integration_discovery(
+        self, discovery_info: dict[str, Any]
+    ) -> config_entries.ConfigFlowResult:
+        """Set up an adapter found by a scan, already probed with its token."""
+        host = discovery_info[CONF_HOST]
+        entry = await self.async_set_unique_id(discovery_info["unique_id"])
+        if entry is not None and (
+            updated := _updated_host(entry.data[CONF_HOST], URL(host).host or "")
+        ):
+            # follow a new address of a configured adapter
+            self._abort_if_unique_id_configured(updates={CONF_HOST: updated})
+        self._abort_if_unique_id_configured()
+        return self.async_create_entry(
+            title=discovery_info["title"],
+            data={
+                CONF_HOST: host,
+                CONF_VERIFY_SSL: discovery_info[CONF_VERIFY_SSL],
+                CONF_TOKEN: discovery_info[CONF_TOKEN],
+            },
+        )
+
+    async def _async_scan(self) -> SMAScanResult:
+        """Probe every host of the subnet with its own connection pool."""
+        network = ip_network(self._scan_input[CONF_SUBNET])
+        async with aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=SCAN_CONCURRENCY, ssl=get_default_context()
+            )
+        ) as session:
+            result = await async_scan(
+                session,
+                (_ip_host(str(ip)) for ip in network.hosts()),
+                self._scan_input[CONF_TOKEN],
+                verify_ssl=self._scan_input[CONF_VERIFY_SSL],
+            )
+        LOGGER.debug(
+            "Found %d adapters in %s, %d with another token",
+            len(result.adapters),
+            network,
+            len(result.unauthorized),
+        )
+        return result
+
+    async def _async_create_entry_or_errors(
+        self, user_input: dict[str, Any], errors: dict[str, str]
+    ) -> config_entries.ConfigFlowResult | None:
+        """Probe the adapter and create its entry, or fill in the errors."""
+        try:
+            status = await self._get_status(
+                host=user_input[CONF_HOST],
+                verify_ssl=user_input[CONF_VERIFY_SSL],
+                token=user_input[CONF_TOKEN],
+            )
+        except SMAApiClientAuthenticationError as exception:
+            LOGGER.warning(exception)
+            errors["base"] = "auth"
+        except SMAApiClientCommunicationError as exception:
+            LOGGER.warning(exception)
+            errors["base"] = "connection"
+        except SMAApiClientError as exception:
+            LOGGER.warning(exception)
+            errors["base"] = "unknown"
+        else:
+            await self.async_set_unique_id(
+                unique_id=adapter_unique_id(status, user_input[CONF_HOST]),
+                raise_on_progress=False,
+            )
+            self._abort_if_unique_id_configured()
+
+            return self.async_create_entry(
+                title=adapter_title(status, user_input[CONF_HOST]),
+                data=user_input,
+            )
+        return None
+
     async def _get_status(
         self,
         *,
@@ -93,9 +334,52 @@ class SMAConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         verify_ssl: bool,
         token: str,
     ) -> Any:
+        # the shared session of Home Assistant, the hub session is closed
+        # with its last entry and would stay open after a failed attempt
         client = SMAApiClient(
             host=host,
             token=token,
-            session=async_create_clientsession(self.hass, verify_ssl=verify_ssl),
+            session=async_get_clientsession(self.hass),
+            verify_ssl=verify_ssl,
         )
         return await client.async_get_status()
+
+
+class SMAOptionsFlow(config_entries.OptionsFlow):
+    """Options flow for Smart Meter Adapter."""
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> config_entries.ConfigFlowResult:
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(data=user_input)
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=self.add_suggested_values_to_schema(
+                vol.Schema(
+                    {
+                        vol.Optional(CONF_MQTT_TOPIC): TextSelector(),
+                        vol.Optional(CONF_DEMAND_LIMIT): NumberSelector(
+                            NumberSelectorConfig(
+                                min=0,
+                                step=100,
+                                unit_of_measurement="W",
+                                mode=NumberSelectorMode.BOX,
+                            )
+                        ),
+                        vol.Optional(CONF_WRITE_INTERVAL): NumberSelector(
+                            NumberSelectorConfig(
+                                min=0,
+                                max=300,
+                                unit_of_measurement="s",
+                                mode=NumberSelectorMode.BOX,
+                            )
+                        ),
+                        vol.Optional(CONF_CAPTURE, default=False): BooleanSelector(),
+                    }
+                ),
+                self.config_entry.options,
+            ),
+        )
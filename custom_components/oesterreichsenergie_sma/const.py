@@ -5,3 +5,78 @@ from logging import Logger, getLogger
 LOGGER: Logger = getLogger(__package__)
 
 DOMAIN = "oesterreichsenergie_sma"
+
+CONF_MQTT_TOPIC = "mqtt_topic"
+CONF_DEMAND_LIMIT = "demand_limit"
+CONF_CAPTURE = "capture"
+CONF_WRITE_INTERVAL = "write_interval"
+CONF_SUBNET = "subnet"
+
+# Fired when a quarter hour demand window closed
+EVENT_DEMAND_WINDOW = f"{DOMAIN}_demand_window"
+# Fired when the projected demand of the running window exceeds the limit
+EVENT_DEMAND_LIMIT = f"{DOMAIN}_demand_limit"
+
+# Maximum number of requests in flight across all adapters
+MAX_IN_FLIGHT = 4
+
+# Seconds an idle connection to an adapter is kept open, just beyond the poll
+# interval so every poll reuses the connection and its TLS session
+KEEPALIVE_TIMEOUT = 20
+
+# Seconds without a pushed MQTT frame before the adapter is polled again
+MQTT_FALLBACK_TIMEOUT = 30
+
+# Seconds between two appends of the captured responses to the capture file
+CAPTURE_FLUSH_INTERVAL = 60
+
+# Number of full-rate frames kept in memory, four hours of one second frames
+BUFFER_SIZE = 4 * 60 * 60
+
+# Minimum change of a value before its entities are updated, by device class
+DEVICE_CLASS_DEADBANDS: dict[str, float] = {
+    "voltage": 0.5,
+}
+# Minimum change of single registers, overriding the one of their device class
+DEADBANDS: dict[str, float] = {}
+
+# Minimum seconds between two state writes of a value, by device class. Changes
+# within the interval are coalesced, the last value is written at its end.
+WRITE_INTERVALS: dict[str, float] = {
+    "energy": 30,
+    "reactive_energy": 30,
+    "voltage": 5,
+    "current": 5,
+    "power_factor": 5,
+}
+
+# Plausible range of a register by device class, frames outside of it are
+# quarantined
+PLAUSIBLE_RANGES: dict[str, tuple[float, float]] = {
+    "energy": (0.0, float("inf")),
+    "reactive_energy": (0.0, float("inf")),
+    "voltage": (100.0, 300.0),
+    "current": (0.0, 1000.0),
+    "power": (0.0, 1_000_000.0),
+    "reactive_power": (0.0, 1_000_000.0),
+    "power_factor": (-1.0, 1.0),
+}
+# Largest plausible change per second by device class, 100 Wh/s are 360 kW
+RATE_LIMITS: dict[str, float] = {
+    "energy": 100.0,
+    "reactive_energy": 100.0,
+    "voltage": 50.0,
+}
+# Consecutive frames a violation is quarantined before it is taken as real,
+# like a replaced meter or an unused phase
+QUARANTINE_PERSISTENCE = 5
+# Number of quarantined frames kept for the diagnostics
+QUARANTINE_SIZE = 20
+
+# Hosts probed at the same time by a subnet scan
+SCAN_CONCURRENCY = 64
+# Seconds a probed host may take to accept the connection, and to respond
+SCAN_CONNECT_TIMEOUT = 1.5
+SCAN_TIMEOUT = 5.0
+# Largest number of addresses of a scanned subnet, a /20
+SCAN_MAX_HOSTS = 4096
@@ -3,19 +3,75 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from datetime import timedelta
+from time import perf_counter, time
 from typing import TYPE_CHECKING, Any
 
+from homeassistant.core import CALLBACK_TYPE, HassJob, callback
 from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util.json import JSON_DECODE_EXCEPTIONS, json_loads
 
 from .api import (
     SMAApiClientAuthenticationError,
     SMAApiClientError,
 )
+from .buffer import SMAMeasurementBuffer
+from .const import (
+    BUFFER_SIZE,
+    CONF_WRITE_INTERVAL,
+    DEADBANDS,
+    DEVICE_CLASS_DEADBANDS,
+    DOMAIN,
+    LOGGER,
+    MQTT_FALLBACK_TIMEOUT,
+    WRITE_INTERVALS,
+)
+from .demand import SMADemandTracker
+from .derived import MEASUREMENT_KEYS, device_class
+from .measurement import SMAMeasurement, parse_measurement
+from .metrics import SMAFrameMetrics
+from .scheduler import SMAFrameScheduler
+from .statistics import (
+    SMACounterStatistics,
+    SMAWindowAggregator,
+    async_import_mean_statistics,
+)
+from .validation import SMAFrameValidator
 
 if TYPE_CHECKING:
+    from homeassistant.components.mqtt import ReceiveMessage
+    from homeassistant.core import HomeAssistant
+
     from .data import SMAConfigEntry
 
+STORAGE_VERSION = 1
+
+# Deadband of the value in each measurement slot
+DEADBAND_SLOTS = {
+    slot: deadband
+    for slot, key in enumerate(MEASUREMENT_KEYS)
+    if (deadband := DEADBANDS.get(key, DEVICE_CLASS_DEADBANDS.get(device_class(key))))
+    is not None
+}
+# Marks registers which were never published
+_UNSET = object()
+
+
+def _is_significant(slot: int, value: Any, previous: Any) -> bool:
+    """Check if a value changed beyond the deadband of its slot."""
+    if value == previous:
+        return False
+    deadband = DEADBAND_SLOTS.get(slot)
+    return (
+        deadband is None
+        or not isinstance(value, int | float)
+        or not isinstance(previous, int | float)
+        or abs(value - previous) >= deadband
+    )
+
 
 # https://developers.home-assistant.io/docs/integration_fetching_data#coordinated-single-api-poll-for-data-for-all-entities
 class SMADataUpdateCoordinatorBase(ABC, DataUpdateCoordinator):
@@ -38,14 +94,317 @@ class SMADataUpdateCoordinatorBase(ABC, DataUpdateCoordinator):
 
 
 class SMAMeasurementDataUpdateCoordinator(SMADataUpdateCoordinatorBase):
-    """Class to fetch Smart Meter Adapter measurement data."""
+    """
+    Class to fetch Smart Meter Adapter measurement data.
 
-    async def _update_method(self) -> Any:
-        return await self.config_entry.runtime_data.client.async_get_measurement()
+    Measurements are either polled from the JSON API or pushed by the adapter
+    via MQTT. Every new pushed frame postpones the next poll to
+    ``MQTT_FALLBACK_TIMEOUT`` seconds later, so HTTP polling only takes over
+    again after the pushes fell silent.
+
+    Polls are phase-locked to the frame clock of the meter, see
+    :class:`SMAFrameScheduler`. Frames the meter already delivered are dropped
+    before they reach the listeners and counted in ``dropped_frames``. New
+    frames with implausible registers are quarantined, see
+    :class:`SMAFrameValidator`. Both only call the diagnostic listeners, so
+    the counters do not wait for the next published frame. Parse and listener
+    fan-out times are tracked in ``frame_metrics``.
+
+    Listeners registered with an OBIS key as context are only called when the
+    value of that register changed by more than its deadband, listeners
+    without context are called for every new frame. Within the write interval
+    of its device class a value is published at most once, later changes are
+    coalesced and the last value is published at the end of the interval.
+    Every frame is still ingested at full rate.
+
+    Every frame is kept in a ring buffer and aggregated over hourly windows,
+    which are imported as long-term statistics. The energy counters are turned
+    into hourly sum statistics, which are backfilled after an outage, see
+    :class:`SMACounterStatistics`. The quarter hour demand is tracked from the
+    import counter, see :class:`SMADemandTracker`.
+    """
+
+    data: SMAMeasurement
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the coordinator."""
+        # unchanged data is not handed to the listeners
+        super().__init__(*args, always_update=False, **kwargs)
+        self.scheduler = SMAFrameScheduler(self.update_interval.total_seconds())
+        self.dropped_frames = 0
+        self.validator = SMAFrameValidator()
+        # called when a frame is dropped or quarantined instead of published
+        self._diagnostic_listeners: list[CALLBACK_TYPE] = []
+        # last frame received, published or quarantined
+        self._last_frame: SMAMeasurement | None = None
+        # the last new frame was pushed, the next poll is only a fallback
+        self._pushed = False
+        self.frame_metrics = SMAFrameMetrics()
+        self._published: list[Any] = [_UNSET] * len(MEASUREMENT_KEYS)
+        self._changed_keys: set[str] | None = None
+        # the write interval option raises the interval of every device class
+        minimum = self.config_entry.options.get(CONF_WRITE_INTERVAL, 0)
+        self._write_intervals = [
+            max(minimum, WRITE_INTERVALS.get(device_class(key) or "", 0))
+            for key in MEASUREMENT_KEYS
+        ]
+        # loop time of the last publish and due time of coalesced changes
+        self._written = [float("-inf")] * len(MEASUREMENT_KEYS)
+        self._deferred: dict[int, float] = {}
+        self._unsub_deferred: CALLBACK_TYPE | None = None
+        self.buffer = SMAMeasurementBuffer(BUFFER_SIZE)
+        self._long_term_aggregator = SMAWindowAggregator(60 * 60)
+        self.counter_statistics = SMACounterStatistics(self.hass, self.config_entry)
+        self.demand = SMADemandTracker(self.hass, self.config_entry)
+
+    async def async_load(self) -> None:
+        """Load the last counter checkpoint and monthly peak before the first frame."""
+        await self.counter_statistics.async_load()
+        await self.demand.async_load()
+
+    async def _update_method(self) -> SMAMeasurement:
+        self._pushed = False
+        payload = await self.config_entry.runtime_data.client.async_get_measurement()
+        start = perf_counter()
+        data = parse_measurement(payload)
+        self.frame_metrics.record_parse(perf_counter() - start)
+        self._observe_frame(data)
+        if self._is_duplicate_frame(data):
+            self.dropped_frames += 1
+            self._async_update_diagnostic_listeners()
+            return self.data
+        sample_time = float(data.time) if data.time is not None else time()
+        if not self._is_valid_frame(sample_time, data):
+            self._async_update_diagnostic_listeners()
+            return self.data
+        self._ingest_frame(sample_time, data)
+        return data
+
+    def _is_valid_frame(self, sample_time: float, data: SMAMeasurement) -> bool:
+        """Validate a new frame, it is quarantined instead of published if not."""
+        if self.validator.validate(sample_time, data):
+            return True
+        LOGGER.debug(
+            "Quarantined frame of %s: %s",
+            self.config_entry.title,
+            self.validator.quarantine[-1]["violations"],
+        )
+        return False
+
+    def _ingest_frame(self, sample_time: float, data: SMAMeasurement) -> None:
+        """Process a new frame before it is handed to the listeners."""
+        self.demand.async_add(sample_time, data)
+        self._diff_frame(data)
+        self.frame_metrics.record_frame(time())
+
+        self.buffer.append(sample_time, data)
+        if closed := self._long_term_aggregator.add(sample_time, data):
+            async_import_mean_statistics(self.hass, self.config_entry, closed)
+        self.counter_statistics.async_add(sample_time, data)
+
+    def _diff_frame(self, data: SMAMeasurement) -> None:
+        """Collect the keys whose value changed beyond their deadband."""
+        changed = set()
+        published = self._published
+        now = self.hass.loop.time()
+        for slot, value in enumerate(data.values):
+            if not data.present >> slot & 1 or not _is_significant(
+                slot, value, published[slot]
+            ):
+                continue
+            if now < (due := self._written[slot] + self._write_intervals[slot]):
+                self._deferred.setdefault(slot, due)
+                continue
+            published[slot] = value
+            self._written[slot] = now
+            changed.add(MEASUREMENT_KEYS[slot])
+        self._schedule_deferred()
+
+        # after a failed update all entities need to refresh their availability
+        self._changed_keys = changed if self.last_update_success else None
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update the listeners of changed registers and those without context."""
+        changed, self._changed_keys = self._changed_keys, None
+        start = perf_counter()
+        for update_callback, context in list(self._listeners.values()):
+            if changed is None or context is None or context in changed:
+                update_callback()
+        self.frame_metrics.record_fanout(perf_counter() - start)
+
+    @callback
+    def async_add_diagnostic_listener(
+        self, update_callback: CALLBACK_TYPE
+    ) -> CALLBACK_TYPE:
+        """Listen for frames which are dropped or quarantined."""
+        self._diagnostic_listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._diagnostic_listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def _async_update_diagnostic_listeners(self) -> None:
+        """Update the diagnostic listeners, no frame is published."""
+        for update_callback in list(self._diagnostic_listeners):
+            update_callback()
+
+    def _schedule_deferred(self) -> None:
+        """Schedule the publish of the next due coalesced change."""
+        if self._unsub_deferred is not None or not self._deferred:
+            return
+        self._unsub_deferred = async_call_later(
+            self.hass,
+            min(self._deferred.values()) - self.hass.loop.time(),
+            HassJob(self._async_publish_deferred, cancel_on_shutdown=True),
+        )
+
+    @callback
+    def _async_publish_deferred(self, _: Any) -> None:
+        """Publish the last value of the coalesced changes which are due."""
+        self._unsub_deferred = None
+        changed = set()
+        published = self._published
+        now = self.hass.loop.time()
+        for slot, due in list(self._deferred.items()):
+            if due > now:
+                continue
+            del self._deferred[slot]
+            data = self.data
+            if (
+                data is None
+                or not data.present >> slot & 1
+                or not _is_significant(slot, data.values[slot], published[slot])
+            ):
+                continue
+            published[slot] = data.values[slot]
+            self._written[slot] = now
+            changed.add(MEASUREMENT_KEYS[slot])
+        self._schedule_deferred()
+
+        for update_callback, context in list(self._listeners.values()):
+            if context in changed:
+                update_callback()
+
+    async def async_shutdown(self) -> None:
+        """Cancel the publish of coalesced changes."""
+        await super().async_shutdown()
+        if self._unsub_deferred is not None:
+            self._unsub_deferred()
+            self._unsub_deferred = None
+
+    def _is_duplicate_frame(self, data: SMAMeasurement) -> bool:
+        """Check if the frame was already seen, by meter time or content."""
+        # quarantined frames are seen too, so a repeated one is not judged again
+        last = self._last_frame if self._last_frame is not None else self.data
+        self._last_frame = data
+        if last is None:
+            return False
+        if data.time is not None:
+            return data.time == last.time
+        return data == last
+
+    def _observe_frame(self, data: SMAMeasurement) -> None:
+        """Feed the meter time of a polled frame to the scheduler."""
+        if data.time is not None:
+            self.scheduler.observe(float(data.time), time())
+
+    @callback
+    def _schedule_refresh(self) -> None:
+        """
+        Schedule the next poll just after the next expected frame of the meter.
+
+        After a pushed frame the poll is only the fallback for silent pushes.
+        The base class polls one update interval after the full second of the
+        loop time plus a random offset, so the interval of every cycle is set
+        to land on the target instead.
+        """
+        if (
+            self.update_interval is not None
+            and not self.config_entry.pref_disable_polling
+        ):
+            delay = (
+                MQTT_FALLBACK_TIMEOUT
+                if self._pushed
+                else self.scheduler.next_delay(time())
+            )
+            self.update_interval = timedelta(
+                seconds=delay + self.hass.loop.time() % 1 - self._microsecond
+            )
+        super()._schedule_refresh()
+
+    async def async_subscribe_mqtt(self, topic: str) -> bool:
+        """Subscribe to the MQTT telemetry topic of the adapter."""
+        # mqtt is an optional dependency, only import it when push is configured
+        from homeassistant.components import mqtt  # noqa: PLC0415
+
+        if not await mqtt.async_wait_for_mqtt_client(self.hass):
+            LOGGER.warning(
+                "MQTT is not available, falling back to polling for %s", topic
+            )
+            return False
+
+        self.config_entry.async_on_unload(
+            await mqtt.async_subscribe(self.hass, topic, self._handle_mqtt_message)
+        )
+        return True
+
+    @callback
+    def _handle_mqtt_message(self, msg: ReceiveMessage) -> None:
+        """Handle a measurement frame pushed by the adapter."""
+        self.async_handle_frame(msg.payload)
+
+    @callback
+    def async_handle_frame(self, payload: str | bytes) -> None:
+        """Decode a raw measurement frame and hand it to the listeners."""
+        try:
+            decoded = json_loads(payload)
+            start = perf_counter()
+            data = parse_measurement(decoded)
+        except (*JSON_DECODE_EXCEPTIONS, SMAApiClientError):
+            LOGGER.debug("Ignoring invalid measurement frame: %s", payload)
+            return
+        self.frame_metrics.record_parse(perf_counter() - start)
+        if self._is_duplicate_frame(data):
+            self.dropped_frames += 1
+            self._async_update_diagnostic_listeners()
+            return
+        sample_time = float(data.time) if data.time is not None else time()
+        if not self._is_valid_frame(sample_time, data):
+            self._async_update_diagnostic_listeners()
+            return
+        self._ingest_frame(sample_time, data)
+        self._pushed = True
+        self.async_set_updated_data(data)
+
+
+def status_store(hass: HomeAssistant, entry: SMAConfigEntry) -> Store[dict[str, Any]]:
+    """Return the store of the last status of an adapter."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.status")
 
 
 class SMAStatusDataUpdateCoordinator(SMADataUpdateCoordinatorBase):
-    """Class to fetch Smart Meter Adapter status data."""
+    """
+    Class to fetch Smart Meter Adapter status data.
+
+    The last status is stored on disk. After a restart it is served from there
+    while the adapter is asked for a fresh one.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the coordinator."""
+        super().__init__(*args, **kwargs)
+        self._store = status_store(self.hass, self.config_entry)
+
+    async def async_load(self) -> None:
+        """Load the stored status, if the adapter was seen before."""
+        self.data = await self._store.async_load()
 
     async def _update_method(self) -> Any:
-        return await self.config_entry.runtime_data.client.async_get_status()
+        status = await self.config_entry.runtime_data.client.async_get_status()
+        if status != self.data:
+            await self._store.async_save(status)
+        return status
@@ -0,0 +1,195 @@
+"""Rolling quarter hour demand of the Smart Meter, the base of the grid tariff."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import CONF_DEMAND_LIMIT, DOMAIN, EVENT_DEMAND_LIMIT, EVENT_DEMAND_WINDOW
+from .derived import MEASUREMENT_SLOTS
+from .obis import OBIS_SLOTS
+
+if TYPE_CHECKING:
+    from .data import SMAConfigEntry
+    from .measurement import SMAMeasurement
+
+STORAGE_VERSION = 1
+# Seconds of a demand window, aligned to the quarter hour
+DEMAND_PERIOD = 15 * 60
+# Seconds into a window before the projection is checked against the limit,
+# before that it follows every short power spike
+DEMAND_LIMIT_GRACE = 60
+HOUR = 60 * 60
+
+# Import energy counter [Wh] and power [W], in either code set of the adapter
+ENERGY_SLOTS = (OBIS_SLOTS["1-0:1.8.0"], OBIS_SLOTS["1-1:1.8.0"])
+POWER_SLOTS = (OBIS_SLOTS["1-0:1.7.0"], OBIS_SLOTS["1-1:1.7.0"])
+
+_DEMAND = MEASUREMENT_SLOTS["demand"]
+_PROJECTED_DEMAND = MEASUREMENT_SLOTS["projected_demand"]
+_WINDOW_DEMAND = MEASUREMENT_SLOTS["window_demand"]
+_PEAK_DEMAND = MEASUREMENT_SLOTS["peak_demand"]
+
+
+def _first_number(values: list[Any], slots: tuple[int, ...]) -> float | None:
+    """Return the first numeric value of slots."""
+    for slot in slots:
+        if isinstance(value := values[slot], int | float):
+            return value
+    return None
+
+
+def _month(time: float) -> str:
+    """Return the local month of a timestamp."""
+    return dt_util.as_local(dt_util.utc_from_timestamp(time)).strftime("%Y-%m")
+
+
+class SMADemandTracker:
+    """
+    Average demand of the quarter hour, streamed from the import energy counter.
+
+    Every window starts from the counter reading at its boundary, interpolated
+    between the frames around it, so each frame costs the same constant work
+    no matter how many frames a window holds. The demand so far is
+    extrapolated to the end of the window with the instantaneous power. Once
+    the projection exceeds the configured limit, or the monthly peak if no
+    limit is set, an event is fired while there is still time to shed load.
+
+    Closed windows are fired as events as well. Complete windows feed the
+    monthly peak, which is stored on disk to survive restarts.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry: SMAConfigEntry) -> None:
+        """Initialize the demand tracker."""
+        self.hass = hass
+        self.entry = entry
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.demand"
+        )
+        self._window_start: float | None = None
+        # counter reading the window starts from and if it is at the boundary
+        self._start_time = 0.0
+        self._start_energy = 0.0
+        self._complete = False
+        self._last_time = 0.0
+        self._last_energy = 0.0
+        self._limit_fired = False
+        self._window_demand: float | None = None
+        # month, demand and window start of the monthly peak
+        self._peak: dict[str, Any] = {}
+
+    async def async_load(self) -> None:
+        """Load the monthly peak."""
+        self._peak = await self._store.async_load() or {}
+
+    @callback
+    def async_add(self, time: float, data: SMAMeasurement) -> None:
+        """Add a frame and store the demand in its demand slots."""
+        values = data.values
+        energy = _first_number(values, ENERGY_SLOTS)
+        if energy is None:
+            return
+        window_start = time - time % DEMAND_PERIOD
+        if self._window_start is None or window_start > self._window_start:
+            self._start_window(window_start, time, energy)
+        elif time <= self._last_time:
+            return
+        self._last_time = time
+        self._last_energy = energy
+
+        used = (energy - self._start_energy) * HOUR
+        demand = used / (time - self._start_time) if time > self._start_time else None
+        window_end = window_start + DEMAND_PERIOD
+        power = _first_number(values, POWER_SLOTS)
+        projected = (
+            demand
+            if power is None
+            else (used + power * (window_end - time)) / (window_end - self._start_time)
+        )
+
+        limit = self.entry.options.get(CONF_DEMAND_LIMIT) or self._peak.get("demand")
+        if (
+            limit
+            and projected is not None
+            and projected > limit
+            and not self._limit_fired
+            and time - window_start >= DEMAND_LIMIT_GRACE
+        ):
+            self._limit_fired = True
+            self.hass.bus.async_fire(
+                EVENT_DEMAND_LIMIT,
+                {
+                    "entry_id": self.entry.entry_id,
+                    "window_start": dt_util.utc_from_timestamp(
+                        window_start
+                    ).isoformat(),
+                    "window_end": dt_util.utc_from_timestamp(window_end).isoformat(),
+                    "demand": demand,
+                    "projected_demand": projected,
+                    "limit": limit,
+                },
+            )
+
+        for slot, value in (
+            (_DEMAND, demand),
+            (_PROJECTED_DEMAND, projected),
+            (_WINDOW_DEMAND, self._window_demand),
+            (_PEAK_DEMAND, self._peak.get("demand")),
+        ):
+            if value is not None:
+                values[slot] = value
+                data.present |= 1 << slot
+
+    def _start_window(self, window_start: float, time: float, energy: float) -> None:
+        """Close the running window and start the one of a frame."""
+        follows = self._window_start == window_start - DEMAND_PERIOD
+        if follows:
+            # interpolate the counter at the boundary between both frames
+            rate = (energy - self._last_energy) / (time - self._last_time)
+            boundary = self._last_energy + rate * (window_start - self._last_time)
+            self._close_window(window_start, boundary, complete=self._complete)
+            self._start_time = window_start
+            self._start_energy = boundary
+        else:
+            if self._window_start is not None and self._last_time > self._start_time:
+                # the adapter was unreachable at the end of the window
+                self._close_window(self._last_time, self._last_energy, complete=False)
+            self._start_time = time
+            self._start_energy = energy
+        self._window_start = window_start
+        self._complete = follows
+        self._limit_fired = False
+
+        month = _month(window_start)
+        if self._peak.get("month") != month:
+            self._peak = {"month": month}
+            self._store.async_delay_save(lambda: self._peak)
+
+    def _close_window(self, end: float, energy: float, *, complete: bool) -> None:
+        """Publish the demand of the running window."""
+        demand = (energy - self._start_energy) * HOUR / (end - self._start_time)
+        self._window_demand = demand
+        peak = complete and demand > self._peak.get("demand", 0)
+        if peak:
+            self._peak.update(demand=demand, start=self._window_start)
+            self._store.async_delay_save(lambda: self._peak)
+        self.hass.bus.async_fire(
+            EVENT_DEMAND_WINDOW,
+            {
+                "entry_id": self.entry.entry_id,
+                "window_start": dt_util.utc_from_timestamp(
+                    self._start_time
+                ).isoformat(),
+                "window_end": dt_util.utc_from_timestamp(end).isoformat(),
+                "demand": demand,
+                "complete": complete,
+                "peak": peak,
+            },
+        )
+
+    async def async_remove(self) -> None:
+        """Remove the monthly peak."""
+        await self._store.async_remove()
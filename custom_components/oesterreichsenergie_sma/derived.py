@@ -0,0 +1,122 @@
+"""Electrical quantities derived from the registers of a measurement frame."""
+
+from __future__ import annotations
+
+from math import hypot
+from typing import TYPE_CHECKING, Any
+
+from .obis import OBIS_KEYS, OBIS_REGISTERS, OBIS_SLOTS
+
+if TYPE_CHECKING:
+    from .measurement import SMAMeasurement
+
+DERIVED_KEYS = (
+    "net_power",
+    "apparent_power_l1",
+    "apparent_power_l2",
+    "apparent_power_l3",
+    "apparent_power",
+    "power_factor",
+)
+
+# Quantities tracked across frames, see SMADemandTracker
+DEMAND_KEYS = (
+    "demand",
+    "projected_demand",
+    "window_demand",
+    "peak_demand",
+)
+
+# Derived quantities are stored in the slots following the OBIS codes
+MEASUREMENT_KEYS: tuple[str, ...] = (*OBIS_KEYS, *DERIVED_KEYS, *DEMAND_KEYS)
+MEASUREMENT_SLOTS: dict[str, int] = {
+    key: slot for slot, key in enumerate(MEASUREMENT_KEYS)
+}
+
+# Device class of the derived and demand quantities, as of their sensors
+DERIVED_DEVICE_CLASSES = {
+    "net_power": "power",
+    "apparent_power_l1": "apparent_power",
+    "apparent_power_l2": "apparent_power",
+    "apparent_power_l3": "apparent_power",
+    "apparent_power": "apparent_power",
+    "power_factor": "power_factor",
+    **dict.fromkeys(DEMAND_KEYS, "power"),
+}
+
+_ACTIVE = (OBIS_SLOTS["1-0:1.7.0"], OBIS_SLOTS["1-0:2.7.0"])
+_REACTIVE = (OBIS_SLOTS["1-0:3.7.0"], OBIS_SLOTS["1-0:4.7.0"])
+# voltage and current slot of every phase
+_PHASES = (
+    (OBIS_SLOTS["1-0:32.7.0"], OBIS_SLOTS["1-0:31.7.0"]),
+    (OBIS_SLOTS["1-0:52.7.0"], OBIS_SLOTS["1-0:51.7.0"]),
+    (OBIS_SLOTS["1-0:72.7.0"], OBIS_SLOTS["1-0:71.7.0"]),
+)
+_NET_POWER = MEASUREMENT_SLOTS["net_power"]
+_APPARENT_L1 = MEASUREMENT_SLOTS["apparent_power_l1"]
+_APPARENT = MEASUREMENT_SLOTS["apparent_power"]
+_POWER_FACTOR = MEASUREMENT_SLOTS["power_factor"]
+
+
+def _mask(*slots: int) -> int:
+    """Return the bit mask of slots."""
+    mask = 0
+    for slot in slots:
+        mask |= 1 << slot
+    return mask
+
+
+# A derived quantity is present in a frame if all of its registers are
+_INPUT_MASKS = (
+    (_NET_POWER, _mask(*_ACTIVE)),
+    *((_APPARENT_L1 + phase, _mask(*slots)) for phase, slots in enumerate(_PHASES)),
+    (_APPARENT, _mask(*(slot for slots in _PHASES for slot in slots))),
+    (_POWER_FACTOR, _mask(*_ACTIVE, *_REACTIVE)),
+)
+
+
+def _difference(values: list[Any], slots: tuple[int, int]) -> float | None:
+    """Return the import minus the export register, if both are numeric."""
+    imported, exported = values[slots[0]], values[slots[1]]
+    if isinstance(imported, int | float) and isinstance(exported, int | float):
+        return imported - exported
+    return None
+
+
+def device_class(key: str) -> str | None:
+    """Return the device class of a register or derived quantity."""
+    if (register := OBIS_REGISTERS.get(key)) is not None:
+        return register.device_class
+    return DERIVED_DEVICE_CLASSES.get(key)
+
+
+def derive_quantities(data: SMAMeasurement) -> None:
+    """Compute the derived quantities of a frame into its derived slots."""
+    values = data.values
+    present = data.present
+    for slot, mask in _INPUT_MASKS:
+        if present & mask == mask:
+            data.present |= 1 << slot
+
+    net_power = values[_NET_POWER] = _difference(values, _ACTIVE)
+
+    apparent_total: float | None = 0.0
+    for phase, (voltage_slot, current_slot) in enumerate(_PHASES):
+        voltage, current = values[voltage_slot], values[current_slot]
+        apparent = None
+        if isinstance(voltage, int | float) and isinstance(current, int | float):
+            apparent = voltage * current
+        values[_APPARENT_L1 + phase] = apparent
+        apparent_total = (
+            None
+            if apparent is None or apparent_total is None
+            else apparent_total + apparent
+        )
+    values[_APPARENT] = apparent_total
+
+    reactive = _difference(values, _REACTIVE)
+    power_factor = None
+    if net_power is not None and reactive is not None:
+        apparent = hypot(net_power, reactive)
+        power_factor = abs(net_power) / apparent if apparent else None
+    values[_POWER_FACTOR] = power_factor
@@ -0,0 +1,46 @@
+"""Diagnostics support for the Österreichsenergie Smart-Meter-Adapter."""
+
+from __future__ import annotations
+
+from time import time
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_HOST, CONF_TOKEN
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+    from .data import SMAConfigEntry
+
+TO_REDACT = {CONF_HOST, CONF_TOKEN, "mac", "title", "unique_id"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant,  # noqa: ARG001 Unused function argument: `hass`
+    entry: SMAConfigEntry,
+) -> dict[str, Any]:
+    """Return the diagnostics of a config entry."""
+    coordinator = entry.runtime_data.measurement_coordinator
+    scheduler = coordinator.scheduler
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "status": async_redact_data(
+            entry.runtime_data.status_coordinator.data, TO_REDACT
+        ),
+        "requests": entry.runtime_data.client.metrics.as_dict(),
+        "frames": {
+            **coordinator.frame_metrics.as_dict(time()),
+            "dropped_frames": coordinator.dropped_frames,
+            "rejected_frames": coordinator.validator.rejected_frames,
+            "quarantine": list(coordinator.validator.quarantine),
+        },
+        "scheduler": {
+            "locked": scheduler.locked,
+            "period": scheduler.period,
+            "latency": scheduler.latency,
+            "missed": scheduler.missed,
+            "phase": scheduler.phase,
+            "interval": scheduler.interval,
+        },
+    }
@@ -0,0 +1,107 @@
+"""Concurrent scan of a subnet for Smart Meter Adapters."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.util import slugify
+
+from .api import (
+    SMAApiClient,
+    SMAApiClientAuthenticationError,
+    SMAApiClientError,
+)
+from .const import SCAN_CONCURRENCY, SCAN_CONNECT_TIMEOUT, SCAN_TIMEOUT
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+    import aiohttp
+
+
+def adapter_unique_id(status: Any, host: str) -> str:
+    """Return the unique id of an adapter, by the MAC address of its status."""
+    return slugify(status["wifi"]["mac"] or status["name"] or host)
+
+
+def adapter_title(status: Any, host: str) -> str:
+    """Return the title of the config entry of an adapter."""
+    return status["name"] or f"Smart Meter Adapter - {host}"
+
+
+@dataclass(slots=True, frozen=True)
+class SMADiscoveredAdapter:
+    """An adapter that answered the scan."""
+
+    host: str
+    unique_id: str
+    title: str
+
+
+@dataclass(slots=True)
+class SMAScanResult:
+    """Adapters found by a scan, each once even if it answered on several hosts."""
+
+    adapters: dict[str, SMADiscoveredAdapter] = field(default_factory=dict)
+    # hosts answering with an authentication error, adapters with another token
+    unauthorized: list[str] = field(default_factory=list)
+
+
+async def async_scan(
+    session: aiohttp.ClientSession,
+    hosts: Iterable[str],
+    token: str,
+    *,
+    verify_ssl: bool,
+) -> SMAScanResult:
+    """
+    Probe the status of every host, at most ``SCAN_CONCURRENCY`` at a time.
+
+    The probes are shared by a fixed number of workers instead of a task per
+    host, and hosts that do not accept the connection fail after the short
+    ``SCAN_CONNECT_TIMEOUT``.
+    """
+    result = SMAScanResult()
+    # shared by the workers, every host is taken by one of them
+    pending = iter(hosts)
+    await asyncio.gather(
+        *(
+            _async_probe(session, pending, token, verify_ssl, result)
+            for _ in range(SCAN_CONCURRENCY)
+        )
+    )
+    return result
+
+
+async def _async_probe(
+    session: aiohttp.ClientSession,
+    hosts: Iterator[str],
+    token: str,
+    verify_ssl: bool,  # noqa: FBT001 Private worker of the scan
+    result: SMAScanResult,
+) -> None:
+    """Probe hosts until none are left."""
+    for host in hosts:
+        client = SMAApiClient(
+            host,
+            token,
+            session,
+            verify_ssl=verify_ssl,
+            timeout=SCAN_TIMEOUT,
+            connect_timeout=SCAN_CONNECT_TIMEOUT,
+        )
+        try:
+            status = await client.async_get_status()
+            unique_id = adapter_unique_id(status, host)
+            title = adapter_title(status, host)
+        except SMAApiClientAuthenticationError:
+            result.unauthorized.append(host)
+        except (SMAApiClientError, KeyError, TypeError):
+            # no adapter, or not one answering like an adapter
+            continue
+        else:
+            result.adapters.setdefault(
+                unique_id, SMADiscoveredAdapter(host, unique_id, title)
+            )
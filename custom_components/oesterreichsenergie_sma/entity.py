@@ -1,5 +1,7 @@
 """Representation of Oesterreichsenergie Smart-Meter-Adapter entities."""
 
+from typing import Any
+
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
@@ -17,9 +19,10 @@ class OeSMAMeasurementEntityBase(CoordinatorEntity[SMADataUpdateCoordinatorBase]
     def __init__(
         self,
         coordinator: SMAMeasurementDataUpdateCoordinator,
+        context: Any = None,
     ) -> None:
         """Initialize the entity."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, context)
 
         self._attr_device_info = DeviceInfo(
             identifiers={
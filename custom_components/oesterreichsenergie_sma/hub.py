@@ -0,0 +1,93 @@
+"""Domain wide hub shared by all Smart Meter Adapters."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+
+import aiohttp
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.util.ssl import get_default_context
+
+from .api import create_trace_config
+from .const import DOMAIN, KEEPALIVE_TIMEOUT, MAX_IN_FLIGHT
+
+if TYPE_CHECKING:
+    from .data import SMAConfigEntry
+    from .scheduler import SMAFrameScheduler
+
+
+class SMAHub:
+    """
+    Shared connection pool and poll schedule of all Smart Meter Adapters.
+
+    All clients use one connector and share a semaphore, which caps the number
+    of requests in flight. The polls of the adapters are spread evenly across
+    the poll interval.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the hub."""
+        self.hass = hass
+        self.semaphore = asyncio.Semaphore(MAX_IN_FLIGHT)
+        self._session: aiohttp.ClientSession | None = None
+        self._entries: dict[str, SMAConfigEntry] = {}
+        self._schedulers: dict[str, SMAFrameScheduler] = {}
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Return the client session with the pooled connector."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=MAX_IN_FLIGHT,
+                    keepalive_timeout=KEEPALIVE_TIMEOUT,
+                    ssl=get_default_context(),
+                ),
+                trace_configs=[create_trace_config()],
+            )
+        return self._session
+
+    @callback
+    def async_register(
+        self, entry: SMAConfigEntry, scheduler: SMAFrameScheduler
+    ) -> None:
+        """Add an adapter to the shared poll schedule."""
+        self._entries[entry.entry_id] = entry
+        self._schedulers[entry.entry_id] = scheduler
+        self._async_spread()
+
+    async def async_unregister(self, entry: SMAConfigEntry) -> None:
+        """Remove an adapter, the last one closes the connection pool."""
+        self._entries.pop(entry.entry_id, None)
+        self._schedulers.pop(entry.entry_id, None)
+        self._async_spread()
+        if not self._entries:
+            await self.async_close()
+
+    async def async_close(self) -> None:
+        """Close the connection pool."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @callback
+    def _async_spread(self) -> None:
+        """Spread the polls of the adapters evenly across the interval."""
+        count = len(self._schedulers)
+        for index, scheduler in enumerate(self._schedulers.values()):
+            scheduler.phase = index * scheduler.interval / count
+
+
+@callback
+def async_get_hub(hass: HomeAssistant) -> SMAHub:
+    """Return the hub, create it on first use."""
+    if (hub := hass.data.get(DOMAIN)) is None:
+        hub = hass.data[DOMAIN] = SMAHub(hass)
+
+        async def _async_close(_: Event) -> None:
+            await hub.async_close()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_close)
+    return hub
@@ -0,0 +1,83 @@
+"""Compact measurement record of the Smart Meter Adapter."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from .api import SMAApiClientError
+from .derived import DEMAND_KEYS, MEASUREMENT_KEYS, MEASUREMENT_SLOTS, derive_quantities
+from .obis import OBIS_KEYS, OBIS_SLOTS
+
+# Register holding the meter time of the frame
+FRAME_TIME_KEY = "0-0:1.0.0"
+# Slots parsed from the frame itself, the demand slots follow them
+FRAME_SLOTS = MEASUREMENT_SLOTS[DEMAND_KEYS[0]]
+_FRAME_MASK = (1 << FRAME_SLOTS) - 1
+
+
+class SMAMeasurement:
+    """
+    Measurement frame of the Smart Meter, parsed once per poll.
+
+    The values of the known OBIS codes are stored in fixed slots, see
+    ``OBIS_SLOTS``, followed by the derived quantities, see ``MEASUREMENT_SLOTS``.
+    The demand slots are filled in by the coordinator.
+    ``present`` is a bit mask of the slots contained in the frame, to tell
+    missing registers apart from ``null`` values.
+    """
+
+    __slots__ = ("present", "time", "values")
+
+    def __init__(self, time: float | None, values: list[Any], present: int) -> None:
+        """Initialize the measurement."""
+        self.time = time
+        self.values = values
+        self.present = present
+
+    def __contains__(self, key: object) -> bool:
+        """Return if the register is contained in the frame."""
+        slot = OBIS_SLOTS.get(key)  # type: ignore[arg-type]
+        return slot is not None and bool(self.present >> slot & 1)
+
+    def __eq__(self, other: object) -> bool:
+        """Compare the content of two frames, without the demand slots."""
+        if not isinstance(other, SMAMeasurement):
+            return NotImplemented
+        return (
+            self.time == other.time
+            and self.present & _FRAME_MASK == other.present & _FRAME_MASK
+            and self.values[:FRAME_SLOTS] == other.values[:FRAME_SLOTS]
+        )
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def get(self, key: str) -> Any:
+        """Return the value of a register, if known."""
+        slot = OBIS_SLOTS.get(key)
+        return None if slot is None else self.values[slot]
+
+    def keys(self) -> list[str]:
+        """Return the registers contained in the frame."""
+        return [key for slot, key in enumerate(OBIS_KEYS) if self.present >> slot & 1]
+
+
+def parse_measurement(payload: Any) -> SMAMeasurement:
+    """Parse a measurement.json payload into a compact record with derived values."""
+    if not isinstance(payload, dict):
+        msg = f"Unexpected measurement payload - {type(payload).__name__}"
+        raise SMAApiClientError(msg)
+
+    values: list[Any] = [None] * len(MEASUREMENT_KEYS)
+    present = 0
+    for key, register in payload.items():
+        slot = OBIS_SLOTS.get(key)
+        if slot is None or not isinstance(register, dict):
+            continue
+        values[slot] = register.get("value")
+        present |= 1 << slot
+
+    frame = payload.get(FRAME_TIME_KEY)
+    time = frame.get("time") if isinstance(frame, dict) else None
+    data = SMAMeasurement(time, values, present)
+    derive_quantities(data)
+    return data
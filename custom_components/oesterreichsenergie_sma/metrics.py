@@ -0,0 +1,134 @@
+"""Request and frame processing metrics of the Smart Meter Adapter."""
+
+from collections import deque
+from dataclasses import dataclass, field
+from math import ceil
+from typing import Any
+
+# Weight of the latest sample in the mean durations
+LATENCY_SMOOTHING = 0.1
+# Upper bounds of the request latency histogram in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Number of recent requests the latency percentiles are computed from
+LATENCY_WINDOW = 240
+
+
+def _smooth(mean: float | None, value: float) -> float:
+    """Return the exponentially weighted mean including a new value."""
+    if mean is None:
+        return value
+    return mean + LATENCY_SMOOTHING * (value - mean)
+
+
+@dataclass(slots=True)
+class SMAClientMetrics:
+    """Request metrics of one Smart Meter Adapter."""
+
+    requests: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    auth_errors: int = 0
+    # requests failed at once while the circuit breaker was open
+    rejected: int = 0
+    last_latency: float | None = None
+    mean_latency: float | None = None
+    connections: int = 0
+    reused_connections: int = 0
+    # response body size in bytes of every endpoint
+    payload_sizes: dict[str, int] = field(default_factory=dict)
+    # request count per latency bucket, the last one counts the slower requests
+    latency_histogram: list[int] = field(
+        default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1)
+    )
+    recent_latencies: deque[float] = field(
+        default_factory=lambda: deque(maxlen=LATENCY_WINDOW)
+    )
+
+    def record(self, latency: float) -> None:
+        """Record the latency of a successful request in seconds."""
+        self.requests += 1
+        self.last_latency = latency
+        self.mean_latency = _smooth(self.mean_latency, latency)
+        self.recent_latencies.append(latency)
+        for bucket, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.latency_histogram[bucket] += 1
+                break
+        else:
+            self.latency_histogram[-1] += 1
+
+    def record_error(self, *, timeout: bool = False, auth: bool = False) -> None:
+        """Record a failed request."""
+        self.requests += 1
+        self.errors += 1
+        self.timeouts += timeout
+        self.auth_errors += auth
+
+    def latency_percentile(self, percent: float) -> float | None:
+        """Return a percentile of the recent request latencies in seconds."""
+        if not self.recent_latencies:
+            return None
+        ordered = sorted(self.recent_latencies)
+        return ordered[max(ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the metrics as a JSON serializable dict."""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "auth_errors": self.auth_errors,
+            "rejected": self.rejected,
+            "connections": self.connections,
+            "reused_connections": self.reused_connections,
+            "last_latency": self.last_latency,
+            "mean_latency": self.mean_latency,
+            "latency_p50": self.latency_percentile(50),
+            "latency_p95": self.latency_percentile(95),
+            "latency_p99": self.latency_percentile(99),
+            "latency_histogram": {
+                **{
+                    f"<={bound}": count
+                    for bound, count in zip(
+                        LATENCY_BUCKETS, self.latency_histogram, strict=False
+                    )
+                },
+                f">{LATENCY_BUCKETS[-1]}": self.latency_histogram[-1],
+            },
+            "payload_sizes": self.payload_sizes,
+        }
+
+
+@dataclass(slots=True)
+class SMAFrameMetrics:
+    """Processing metrics of the measurement frames of one Smart Meter Adapter."""
+
+    frames: int = 0
+    mean_parse_time: float | None = None
+    mean_fanout_time: float | None = None
+    # wall clock time the last new frame was received
+    last_frame: float | None = None
+
+    def record_parse(self, duration: float) -> None:
+        """Record the time spent parsing a frame in seconds."""
+        self.mean_parse_time = _smooth(self.mean_parse_time, duration)
+
+    def record_frame(self, received: float) -> None:
+        """Record the receive time of a new frame."""
+        self.frames += 1
+        self.last_frame = received
+
+    def record_fanout(self, duration: float) -> None:
+        """Record the time spent updating the listeners in seconds."""
+        self.mean_fanout_time = _smooth(self.mean_fanout_time, duration)
+
+    def as_dict(self, now: float) -> dict[str, Any]:
+        """Return the metrics as a JSON serializable dict."""
+        return {
+            "frames": self.frames,
+            "mean_parse_time": self.mean_parse_time,
+            "mean_fanout_time": self.mean_fanout_time,
+            "last_frame_age": None
+            if self.last_frame is None
+            else now - self.last_frame,
+        }
@@ -4,6 +4,13 @@ Class for various OBIS codes.
 Extracted from https://oesterreichsenergie.at/fileadmin/user_upload/Smart_Meter-Plattform/20200201_Konzept_Kundenschnittstelle_SM.pdf.
 """
 
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from .measurement import SMAMeasurement
+
 OBIS_CODES = {
     "0-0:1.0.0": "Date and time",
     "0-0:C.1.0": "Meter serial number",
@@ -74,14 +81,115 @@ OBIS_CODES = {
 }
 
 
-def get_meter_number(data: dict) -> str | None:
-    """Try to extract meter number from data."""
-    meter_numbers = [
+class OBISRegister(NamedTuple):
+    """Unit and sensor properties of a numeric OBIS register."""
+
+    unit: str | None
+    device_class: str | None
+    state_class: str
+    translation_key: str
+    suggested_unit: str | None = None
+    tariff: int | None = None
+
+
+def _energy(translation_key: str, tariff: int | None = None) -> OBISRegister:
+    return OBISRegister("Wh", "energy", "total", translation_key, "kWh", tariff)
+
+
+def _reactive_energy(translation_key: str, tariff: int | None = None) -> OBISRegister:
+    return OBISRegister(
+        "varh", "reactive_energy", "total", translation_key, "kvarh", tariff
+    )
+
+
+def _instantaneous(
+    unit: str | None, device_class: str | None, translation_key: str
+) -> OBISRegister:
+    return OBISRegister(unit, device_class, "measurement", translation_key)
+
+
+# Numeric registers, an entity is created for every one present in the frames
+OBIS_REGISTERS: dict[str, OBISRegister] = {
+    "1-0:1.8.0": _energy("active_energy_import"),
+    **{
+        f"1-0:1.8.{tariff}": _energy("active_energy_import_tariff", tariff)
+        for tariff in range(1, 5)
+    },
+    "1-0:2.8.0": _energy("active_energy_export"),
+    **{
+        f"1-0:2.8.{tariff}": _energy("active_energy_export_tariff", tariff)
+        for tariff in range(1, 5)
+    },
+    "1-0:3.8.0": _reactive_energy("reactive_energy_import"),
+    **{
+        f"1-0:3.8.{tariff}": _reactive_energy("reactive_energy_import_tariff", tariff)
+        for tariff in range(1, 5)
+    },
+    "1-0:4.8.0": _reactive_energy("reactive_energy_export"),
+    **{
+        f"1-0:4.8.{tariff}": _reactive_energy("reactive_energy_export_tariff", tariff)
+        for tariff in range(1, 5)
+    },
+    "1-0:15.8.0": _energy("active_energy_total"),
+    **{
+        f"1-0:15.8.{tariff}": _energy("active_energy_total_tariff", tariff)
+        for tariff in range(1, 5)
+    },
+    "1-1:1.8.0": _energy("active_energy_import_channel_1"),
+    "1-1:2.8.0": _energy("active_energy_export_channel_1"),
+    "1-1:3.8.1": _reactive_energy("reactive_energy_import_channel_1"),
+    "1-1:4.8.1": _reactive_energy("reactive_energy_export_channel_1"),
+    "1-0:1.7.0": _instantaneous("W", "power", "power_import"),
+    "1-0:2.7.0": _instantaneous("W", "power", "power_export"),
+    "1-0:1.6.0": _instantaneous("W", "power", "power_import_max"),
+    "1-0:15.35.0": _instantaneous("W", "power", "power_over_limit"),
+    "1-1:1.7.0": _instantaneous("W", "power", "power_import_channel_1"),
+    "1-1:2.7.0": _instantaneous("W", "power", "power_export_channel_1"),
+    "1-0:3.7.0": _instantaneous("var", "reactive_power", "reactive_power_import"),
+    "1-0:4.7.0": _instantaneous("var", "reactive_power", "reactive_power_export"),
+    "1-1:3.7.0": _instantaneous(
+        "var", "reactive_power", "reactive_power_import_channel_1"
+    ),
+    "1-1:4.7.0": _instantaneous(
+        "var", "reactive_power", "reactive_power_export_channel_1"
+    ),
+    "1-0:32.7.0": _instantaneous("V", "voltage", "voltage_l1"),
+    "1-0:52.7.0": _instantaneous("V", "voltage", "voltage_l2"),
+    "1-0:72.7.0": _instantaneous("V", "voltage", "voltage_l3"),
+    "1-0:31.7.0": _instantaneous("A", "current", "current_l1"),
+    "1-0:51.7.0": _instantaneous("A", "current", "current_l2"),
+    "1-0:71.7.0": _instantaneous("A", "current", "current_l3"),
+    "1-0:81.7.40": _instantaneous("°", None, "phase_angle_l1"),
+    "1-0:81.7.51": _instantaneous("°", None, "phase_angle_l2"),
+    "1-0:81.7.62": _instantaneous("°", None, "phase_angle_l3"),
+    "1-0:33.7.0": _instantaneous(None, "power_factor", "power_factor_l1"),
+    "1-0:53.7.0": _instantaneous(None, "power_factor", "power_factor_l2"),
+    "1-0:73.7.0": _instantaneous(None, "power_factor", "power_factor_l3"),
+    "1-0:13.7.0": _instantaneous(None, "power_factor", "meter_power_factor"),
+}
+
+# Unit of the numeric registers
+OBIS_UNITS: dict[str, str | None] = {
+    key: register.unit for key, register in OBIS_REGISTERS.items()
+}
+
+# Fixed slot of every known OBIS code in a parsed measurement
+OBIS_SLOTS: dict[str, int] = {key: slot for slot, key in enumerate(OBIS_CODES)}
+OBIS_KEYS: tuple[str, ...] = tuple(OBIS_CODES)
+
+METER_NUMBER_SLOTS = tuple(
+    OBIS_SLOTS[key]
+    for key in (
         "0-0:96.1.0",
         "0-0:96.1.1",
         "0.0.1",
-    ]
-    for k, v in data.items():
-        if k in meter_numbers and len(v["value"] or v) > 0:
-            return v["value"]
+    )
+)
+
+
+def get_meter_number(data: SMAMeasurement) -> str | None:
+    """Try to extract meter number from data."""
+    for slot in METER_NUMBER_SLOTS:
+        if value := data.values[slot]:
+            return value
     return None
@@ -0,0 +1,100 @@
+"""Polling scheduler aligned to the frame clock of the Smart Meter."""
+
+from __future__ import annotations
+
+from collections import deque
+from math import ceil, floor, gcd
+
+# Safety margin after the expected frame before the adapter is polled
+FRAME_GUARD = 0.5
+# Number of observed frame deltas used to learn the period
+FRAME_HISTORY = 16
+
+
+class SMAFrameScheduler:
+    """
+    Learn the publish cadence of the meter and schedule polls just after a frame.
+
+    The meter stamps every frame with its own clock (``0-0:1.0.0``). The period
+    is learned as the greatest common divisor of the distinct frame deltas. The
+    latency between frame time and local availability starts at the observed
+    receive delay and probes earlier with every frame that arrives as expected,
+    with a growing step until the first miss and a small constant step
+    afterwards. Receiving an older frame than the targeted one means the poll
+    was too early and backs off the latency, so clock drift is corrected in
+    both directions.
+
+    Polls are aligned to a grid of the poll interval shifted by ``phase``,
+    which spreads several adapters evenly. Once the frame clock is known, the
+    grid is laid over the frame time and every poll targets the frame closest
+    to its grid point, so adapters of meters publishing at the same time fetch
+    different frames instead of polling at once.
+    """
+
+    def __init__(self, interval: float) -> None:
+        """Initialize the scheduler with the nominal poll interval in seconds."""
+        self.interval = interval
+        self.phase = 0.0
+        self.period: float | None = None
+        self.latency: float | None = None
+        self.missed = 0
+        self._probe = FRAME_GUARD / 4
+        self._last_frame: float | None = None
+        self._expected_frame: float | None = None
+        self._deltas: deque[int] = deque(maxlen=FRAME_HISTORY)
+
+    @property
+    def locked(self) -> bool:
+        """Return if the scheduler knows the frame clock of the meter."""
+        return self.period is not None and self.latency is not None
+
+    def observe(self, frame_time: float, received: float) -> None:
+        """Feed the meter timestamp of a fetched frame and its local receive time."""
+        expected, self._expected_frame = self._expected_frame, None
+        if self.latency is None:
+            self.latency = received - frame_time
+        elif expected is not None and frame_time < expected:
+            # an older frame than targeted, the poll was too early
+            self.latency += FRAME_GUARD
+            self._probe = FRAME_GUARD / 16
+            self.missed += 1
+        elif self.period is not None:
+            # probe for an earlier frame availability
+            self.latency = min(self.latency, received - frame_time) - self._probe
+            if not self.missed:
+                self._probe = min(self._probe * 2, self.period / 4)
+
+        if self._last_frame is not None and frame_time > self._last_frame:
+            self._deltas.append(round(frame_time - self._last_frame))
+            self.period = float(gcd(*self._deltas)) or None
+        if self._last_frame is None or frame_time > self._last_frame:
+            self._last_frame = frame_time
+
+    def next_delay(self, now: float) -> float:
+        """Return the delay in seconds until the next poll."""
+        if self._last_frame is None or self.latency is None or self.period is None:
+            return self._grid_point(now) - now
+
+        offset = self.latency + FRAME_GUARD
+        frame_now = now - offset
+        if self.period < self.interval:
+            # land right after the frame closest to the grid point
+            steps = floor(
+                (self._grid_point(frame_now) - self._last_frame) / self.period + 0.5
+            )
+        else:
+            # the meter publishes slower than we poll, fetch every frame once
+            steps = ceil((frame_now - self._last_frame) / self.period)
+        frame = self._last_frame + max(steps, 1) * self.period
+        while frame + offset <= now:
+            frame += self.period
+
+        self._expected_frame = frame
+        return frame + offset - now
+
+    def _grid_point(self, now: float) -> float:
+        """Return the next point of the grid shifted by the phase."""
+        # at least half an interval ahead, which keeps the nominal poll rate
+        # while moving onto the grid
+        intervals = ceil((now + self.interval / 2 - self.phase) / self.interval)
+        return self.phase + intervals * self.interval
@@ -1,10 +1,12 @@
 """Representation of Oesterreichsenergie Smart-Meter-Adapter sensors."""
 
-from dataclasses import dataclass
+from collections.abc import Callable
 from datetime import datetime
+from functools import cache
 from zoneinfo import ZoneInfo
 
 from homeassistant.components.sensor import (
+    RestoreSensor,
     SensorDeviceClass,
     SensorEntity,
     SensorEntityDescription,
@@ -12,144 +14,361 @@ from homeassistant.components.sensor import (
 )
 from homeassistant.const import (
     EntityCategory,
-    UnitOfElectricCurrent,
-    UnitOfElectricPotential,
-    UnitOfEnergy,
+    UnitOfApparentPower,
+    UnitOfInformation,
     UnitOfPower,
-    UnitOfReactiveEnergy,
+    UnitOfTime,
 )
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.typing import StateType
+from homeassistant.util import dt as dt_util
 
+from .api import MEASUREMENT_ENDPOINT
 from .coordinator import SMAMeasurementDataUpdateCoordinator
 from .data import SMAConfigEntry
+from .derived import DEMAND_KEYS, DERIVED_KEYS, MEASUREMENT_KEYS, MEASUREMENT_SLOTS
 from .entity import OeSMAMeasurementEntityBase
+from .metrics import SMAClientMetrics
+from .obis import OBIS_REGISTERS
+from .statistics import COUNTER_KEYS
 
-
-@dataclass(frozen=True)
-class OeSMASensorEntityDescription(SensorEntityDescription):
-    """Describes Oesterreichsenergie Smart-Meter-Adapter sensor entities."""
-
-
-ENTITY_DESCRIPTIONS = [
-    OeSMASensorEntityDescription(
-        key="1-0:1.8.0",
-        translation_key="active_energy_import",
-        device_class=SensorDeviceClass.ENERGY,
-        state_class=SensorStateClass.TOTAL,
-        native_unit_of_measurement=UnitOfEnergy.WATT_HOUR,
-        suggested_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
-    ),
-    OeSMASensorEntityDescription(
-        key="1-0:2.8.0",
-        translation_key="active_energy_export",
-        device_class=SensorDeviceClass.ENERGY,
-        state_class=SensorStateClass.TOTAL,
-        native_unit_of_measurement=UnitOfEnergy.WATT_HOUR,
-        suggested_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
-    ),
-    OeSMASensorEntityDescription(
-        key="1-0:3.8.0",
-        translation_key="reactive_energy_import",
-        device_class=SensorDeviceClass.REACTIVE_ENERGY,
-        state_class=SensorStateClass.TOTAL,
-        native_unit_of_measurement=UnitOfReactiveEnergy.VOLT_AMPERE_REACTIVE_HOUR,
-        suggested_unit_of_measurement=UnitOfReactiveEnergy.KILO_VOLT_AMPERE_REACTIVE_HOUR,
-    ),
-    OeSMASensorEntityDescription(
-        key="1-0:4.8.0",
-        translation_key="reactive_energy_export",
-        device_class=SensorDeviceClass.REACTIVE_ENERGY,
-        state_class=SensorStateClass.TOTAL,
-        native_unit_of_measurement=UnitOfReactiveEnergy.VOLT_AMPERE_REACTIVE_HOUR,
-        suggested_unit_of_measurement=UnitOfReactiveEnergy.KILO_VOLT_AMPERE_REACTIVE_HOUR,
-    ),
-    OeSMASensorEntityDescription(
-        key="1-0:1.7.0",
-        translation_key="power_import",
-        device_class=SensorDeviceClass.POWER,
-        state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfPower.WATT,
-        suggested_unit_of_measurement=UnitOfPower.WATT,
-    ),
-    OeSMASensorEntityDescription(
-        key="1-0:2.7.0",
-        translation_key="power_export",
-        device_class=SensorDeviceClass.POWER,
-        state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfPower.WATT,
-        suggested_unit_of_measurement=UnitOfPower.WATT,
-    ),
-    OeSMASensorEntityDescription(
-        key="1-0:32.7.0",
-        translation_key="voltage_l1",
-        device_class=SensorDeviceClass.VOLTAGE,
-        state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        suggested_unit_of_measurement=UnitOfElectricPotential.VOLT,
-    ),
-    OeSMASensorEntityDescription(
-        key="1-0:52.7.0",
-        translation_key="voltage_l2",
-        device_class=SensorDeviceClass.VOLTAGE,
-        state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        suggested_unit_of_measurement=UnitOfElectricPotential.VOLT,
-    ),
-    OeSMASensorEntityDescription(
-        key="1-0:72.7.0",
-        translation_key="voltage_l3",
-        device_class=SensorDeviceClass.VOLTAGE,
-        state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        suggested_unit_of_measurement=UnitOfElectricPotential.VOLT,
-    ),
-    OeSMASensorEntityDescription(
-        key="1-0:31.7.0",
-        translation_key="current_l1",
-        device_class=SensorDeviceClass.CURRENT,
-        state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
-        suggested_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
-    ),
-    OeSMASensorEntityDescription(
-        key="1-0:51.7.0",
-        translation_key="current_l2",
-        device_class=SensorDeviceClass.CURRENT,
-        state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
-        suggested_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
-    ),
-    OeSMASensorEntityDescription(
-        key="1-0:71.7.0",
-        translation_key="current_l3",
-        device_class=SensorDeviceClass.CURRENT,
-        state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
-        suggested_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
-    ),
+# Every entity description class costs milliseconds at import, so all sensors
+# use the plain SensorEntityDescription, the diagnostic ones with a value_fn
+type DiagnosticValueFn = Callable[
+    [SMAMeasurementDataUpdateCoordinator], StateType | datetime
 ]
 
 
+@cache
+def _derived_descriptions() -> dict[str, SensorEntityDescription]:
+    """
+    Describe the quantities computed by the coordinator, built on first use.
+
+    See derive_quantities and SMADemandTracker.
+    """
+    return {
+        description.key: description
+        for description in (
+            SensorEntityDescription(
+                key="net_power",
+                translation_key="net_power",
+                device_class=SensorDeviceClass.POWER,
+                state_class=SensorStateClass.MEASUREMENT,
+                native_unit_of_measurement=UnitOfPower.WATT,
+                suggested_unit_of_measurement=UnitOfPower.WATT,
+            ),
+            *(
+                SensorEntityDescription(
+                    key=key,
+                    translation_key=key,
+                    device_class=SensorDeviceClass.APPARENT_POWER,
+                    state_class=SensorStateClass.MEASUREMENT,
+                    native_unit_of_measurement=UnitOfApparentPower.VOLT_AMPERE,
+                    suggested_display_precision=0,
+                    entity_registry_enabled_default=False,
+                )
+                for key in (
+                    "apparent_power_l1",
+                    "apparent_power_l2",
+                    "apparent_power_l3",
+                    "apparent_power",
+                )
+            ),
+            SensorEntityDescription(
+                key="power_factor",
+                translation_key="power_factor",
+                device_class=SensorDeviceClass.POWER_FACTOR,
+                state_class=SensorStateClass.MEASUREMENT,
+                suggested_display_precision=2,
+                entity_registry_enabled_default=False,
+            ),
+            *(
+                SensorEntityDescription(
+                    key=key,
+                    translation_key=key,
+                    device_class=SensorDeviceClass.POWER,
+                    state_class=SensorStateClass.MEASUREMENT,
+                    native_unit_of_measurement=UnitOfPower.WATT,
+                    suggested_display_precision=0,
+                )
+                for key in (
+                    "demand",
+                    "projected_demand",
+                    "window_demand",
+                    "peak_demand",
+                )
+            ),
+        )
+    }
+
+
+# Slots of the registers and quantities which get a sensor once present
+SENSOR_MASK = sum(
+    1 << MEASUREMENT_SLOTS[key]
+    for key in (*OBIS_REGISTERS, *DERIVED_KEYS, *DEMAND_KEYS)
+)
+
+
+@cache
+def measurement_description(key: str) -> SensorEntityDescription:
+    """Return the description of a register or derived quantity, built once."""
+    if (description := _derived_descriptions().get(key)) is not None:
+        return description
+    register = OBIS_REGISTERS[key]
+    return SensorEntityDescription(
+        key=key,
+        translation_key=register.translation_key,
+        translation_placeholders=None
+        if register.tariff is None
+        else {"tariff": str(register.tariff)},
+        device_class=None
+        if register.device_class is None
+        else SensorDeviceClass(register.device_class),
+        state_class=SensorStateClass(register.state_class),
+        native_unit_of_measurement=register.unit,
+        suggested_unit_of_measurement=register.suggested_unit,
+        # the active energy of every tariff is covered by the counter statistics
+        entity_registry_enabled_default=key not in COUNTER_KEYS
+        or register.tariff is None,
+    )
+
+
+def _client_metrics(
+    coordinator: SMAMeasurementDataUpdateCoordinator,
+) -> SMAClientMetrics:
+    """Return the request metrics of the adapter."""
+    return coordinator.config_entry.runtime_data.client.metrics
+
+
+def _milliseconds(seconds: float | None) -> float | None:
+    """Convert a duration in seconds to milliseconds."""
+    return None if seconds is None else seconds * 1000
+
+
+def _last_frame(coordinator: SMAMeasurementDataUpdateCoordinator) -> datetime | None:
+    """Return the time the last new frame was received."""
+    if (last_frame := coordinator.frame_metrics.last_frame) is None:
+        return None
+    return dt_util.utc_from_timestamp(last_frame)
+
+
+def _latency_description(
+    percent: int,
+) -> tuple[SensorEntityDescription, DiagnosticValueFn]:
+    """Describe a request latency percentile sensor."""
+    return (
+        SensorEntityDescription(
+            key=f"request_latency_p{percent}",
+            translation_key=f"request_latency_p{percent}",
+            device_class=SensorDeviceClass.DURATION,
+            state_class=SensorStateClass.MEASUREMENT,
+            native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+            suggested_display_precision=0,
+            entity_category=EntityCategory.DIAGNOSTIC,
+            entity_registry_enabled_default=False,
+        ),
+        lambda coordinator: _milliseconds(
+            _client_metrics(coordinator).latency_percentile(percent)
+        ),
+    )
+
+
+@cache
+def _diagnostic_descriptions() -> list[
+    tuple[SensorEntityDescription, DiagnosticValueFn]
+]:
+    """Describe the diagnostic sensors, built on first use."""
+    return [
+        (
+            SensorEntityDescription(
+                key="dropped_frames",
+                translation_key="dropped_frames",
+                state_class=SensorStateClass.TOTAL_INCREASING,
+                entity_category=EntityCategory.DIAGNOSTIC,
+                entity_registry_enabled_default=False,
+                icon="mdi:content-duplicate",
+            ),
+            lambda coordinator: coordinator.dropped_frames,
+        ),
+        (
+            SensorEntityDescription(
+                key="rejected_frames",
+                translation_key="rejected_frames",
+                state_class=SensorStateClass.TOTAL_INCREASING,
+                entity_category=EntityCategory.DIAGNOSTIC,
+                entity_registry_enabled_default=False,
+                icon="mdi:filter-remove-outline",
+            ),
+            lambda coordinator: coordinator.validator.rejected_frames,
+        ),
+        (
+            SensorEntityDescription(
+                key="request_latency",
+                translation_key="request_latency",
+                device_class=SensorDeviceClass.DURATION,
+                state_class=SensorStateClass.MEASUREMENT,
+                native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+                suggested_display_precision=0,
+                entity_category=EntityCategory.DIAGNOSTIC,
+                entity_registry_enabled_default=False,
+            ),
+            lambda coordinator: _milliseconds(
+                _client_metrics(coordinator).mean_latency
+            ),
+        ),
+        (
+            SensorEntityDescription(
+                key="request_errors",
+                translation_key="request_errors",
+                state_class=SensorStateClass.TOTAL_INCREASING,
+                entity_category=EntityCategory.DIAGNOSTIC,
+                entity_registry_enabled_default=False,
+                icon="mdi:alert-circle-outline",
+            ),
+            lambda coordinator: _client_metrics(coordinator).errors,
+        ),
+        _latency_description(50),
+        _latency_description(95),
+        _latency_description(99),
+        (
+            SensorEntityDescription(
+                key="request_timeouts",
+                translation_key="request_timeouts",
+                state_class=SensorStateClass.TOTAL_INCREASING,
+                entity_category=EntityCategory.DIAGNOSTIC,
+                entity_registry_enabled_default=False,
+                icon="mdi:timer-alert-outline",
+            ),
+            lambda coordinator: _client_metrics(coordinator).timeouts,
+        ),
+        (
+            SensorEntityDescription(
+                key="auth_errors",
+                translation_key="auth_errors",
+                state_class=SensorStateClass.TOTAL_INCREASING,
+                entity_category=EntityCategory.DIAGNOSTIC,
+                entity_registry_enabled_default=False,
+                icon="mdi:key-alert-outline",
+            ),
+            lambda coordinator: _client_metrics(coordinator).auth_errors,
+        ),
+        (
+            SensorEntityDescription(
+                key="payload_size",
+                translation_key="payload_size",
+                device_class=SensorDeviceClass.DATA_SIZE,
+                state_class=SensorStateClass.MEASUREMENT,
+                native_unit_of_measurement=UnitOfInformation.BYTES,
+                entity_category=EntityCategory.DIAGNOSTIC,
+                entity_registry_enabled_default=False,
+            ),
+            lambda coordinator: _client_metrics(coordinator).payload_sizes.get(
+                MEASUREMENT_ENDPOINT
+            ),
+        ),
+        (
+            SensorEntityDescription(
+                key="parse_time",
+                translation_key="parse_time",
+                device_class=SensorDeviceClass.DURATION,
+                state_class=SensorStateClass.MEASUREMENT,
+                native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+                suggested_display_precision=3,
+                entity_category=EntityCategory.DIAGNOSTIC,
+                entity_registry_enabled_default=False,
+            ),
+            lambda coordinator: _milliseconds(
+                coordinator.frame_metrics.mean_parse_time
+            ),
+        ),
+        (
+            SensorEntityDescription(
+                key="fanout_time",
+                translation_key="fanout_time",
+                device_class=SensorDeviceClass.DURATION,
+                state_class=SensorStateClass.MEASUREMENT,
+                native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+                suggested_display_precision=3,
+                entity_category=EntityCategory.DIAGNOSTIC,
+                entity_registry_enabled_default=False,
+            ),
+            lambda coordinator: _milliseconds(
+                coordinator.frame_metrics.mean_fanout_time
+            ),
+        ),
+        (
+            SensorEntityDescription(
+                key="last_frame",
+                translation_key="last_frame",
+                device_class=SensorDeviceClass.TIMESTAMP,
+                entity_category=EntityCategory.DIAGNOSTIC,
+                entity_registry_enabled_default=False,
+                icon="mdi:clock-check-outline",
+            ),
+            _last_frame,
+        ),
+    ]
+
+
+def _registered_mask(hass: HomeAssistant, entry: SMAConfigEntry) -> int:
+    """Return the slots of the measurement sensors registered in a previous run."""
+    prefix = f"{entry.entry_id}_"
+    mask = 0
+    for entity in er.async_entries_for_config_entry(er.async_get(hass), entry.entry_id):
+        slot = MEASUREMENT_SLOTS.get(entity.unique_id.removeprefix(prefix))
+        if slot is not None:
+            mask |= 1 << slot
+    return mask & SENSOR_MASK
+
+
 async def async_setup_entry(
-    hass: HomeAssistant,  # noqa: ARG001 Unused function argument: `hass`
+    hass: HomeAssistant,
     entry: SMAConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the sensor platform."""
-    async_add_entities(
-        OeSMAMeasurementSensor(
-            coordinator=entry.runtime_data.measurement_coordinator,
-            entity_description=entity_description,
+    coordinator = entry.runtime_data.measurement_coordinator
+
+    @callback
+    def _async_add_measurement_sensors(slots: int) -> None:
+        """Add a sensor for every register or quantity in slots."""
+        async_add_entities(
+            OeSMAMeasurementSensor(
+                coordinator=coordinator,
+                entity_description=measurement_description(key),
+            )
+            for slot, key in enumerate(MEASUREMENT_KEYS)
+            if slots >> slot & 1
         )
-        for entity_description in ENTITY_DESCRIPTIONS
+
+    # sensors known from a previous run restore their state until the first frame
+    added = _registered_mask(hass, entry)
+    if coordinator.data is not None:
+        added |= coordinator.data.present & SENSOR_MASK
+    _async_add_measurement_sensors(added)
+
+    @callback
+    def _async_add_new_measurement_sensors() -> None:
+        """Add a sensor for every register or quantity seen the first time."""
+        nonlocal added
+        if coordinator.data is None or not (
+            new := coordinator.data.present & SENSOR_MASK & ~added
+        ):
+            return
+        added |= new
+        _async_add_measurement_sensors(new)
+
+    entry.async_on_unload(
+        coordinator.async_add_listener(_async_add_new_measurement_sensors)
     )
 
     async_add_entities(
         {
             OeSMAMeterDateSensor(
                 coordinator=entry.runtime_data.measurement_coordinator,
-                entity_description=OeSMASensorEntityDescription(
+                entity_description=SensorEntityDescription(
                     key="0-0:1.0.0",
                     translation_key="meter_date",
                     device_class=SensorDeviceClass.DATE,
@@ -162,9 +381,23 @@ async def async_setup_entry(
         }
     )
 
+    async_add_entities(
+        OeSMADiagnosticSensor(
+            coordinator=entry.runtime_data.measurement_coordinator,
+            entity_description=entity_description,
+            value_fn=value_fn,
+        )
+        for entity_description, value_fn in _diagnostic_descriptions()
+    )
+
+
+class OeSMAMeasurementSensor(OeSMAMeasurementEntityBase, RestoreSensor):
+    """
+    Representation of a Smart Meter Adapter measurement sensor.
 
-class OeSMAMeasurementSensor(OeSMAMeasurementEntityBase, SensorEntity):
-    """Representation of a Smart Meter Adapter measurement sensor."""
+    The last state is restored while the first frame after a restart is still
+    being fetched.
+    """
 
     def __init__(
         self,
@@ -172,7 +405,8 @@ class OeSMAMeasurementSensor(OeSMAMeasurementEntityBase, SensorEntity):
         entity_description: SensorEntityDescription,
     ) -> None:
         """Initialize the sensor."""
-        super().__init__(coordinator)
+        # only woken when the value of its register changed
+        super().__init__(coordinator, context=entity_description.key)
         self.entity_description = entity_description
         self._attr_unique_id = (
             f"{coordinator.config_entry.entry_id}_{entity_description.key}"
@@ -181,17 +415,28 @@ class OeSMAMeasurementSensor(OeSMAMeasurementEntityBase, SensorEntity):
             entity_description.translation_key or entity_description.key
         )
 
-        self._attr_native_value = coordinator.data[entity_description.key]["value"]
+        self._slot = MEASUREMENT_SLOTS[entity_description.key]
+
+        if coordinator.data is not None:
+            self._attr_native_value = coordinator.data.values[self._slot]
+
+    async def async_added_to_hass(self) -> None:
+        """Restore the last state if no frame was received yet."""
+        await super().async_added_to_hass()
+        if self.coordinator.data is None and (
+            last_sensor_data := await self.async_get_last_sensor_data()
+        ):
+            self._attr_native_value = last_sensor_data.native_value
 
     @callback
     def _handle_coordinator_update(self) -> None:
-        self._attr_native_value = self.coordinator.data[self.entity_description.key][
-            "value"
-        ]
+        # a failed first refresh keeps the restored state
+        if self.coordinator.data is not None:
+            self._attr_native_value = self.coordinator.data.values[self._slot]
         self.async_write_ha_state()
 
 
-class OeSMAMeterDateSensor(OeSMAMeasurementEntityBase, SensorEntity):
+class OeSMAMeterDateSensor(OeSMAMeasurementEntityBase, RestoreSensor):
     """Representation of a Smart Meter Adapter timestamp."""
 
     def __init__(
@@ -209,14 +454,67 @@ class OeSMAMeterDateSensor(OeSMAMeasurementEntityBase, SensorEntity):
             entity_description.translation_key or entity_description.key
         )
 
-        self.set_value(coordinator.data[entity_description.key]["time"])
+        if coordinator.data is not None:
+            self.set_value(coordinator.data.time)
 
-    def set_value(self, value: str | float) -> None:
+    async def async_added_to_hass(self) -> None:
+        """Restore the last state if no frame was received yet."""
+        await super().async_added_to_hass()
+        if self.coordinator.data is None and (
+            last_sensor_data := await self.async_get_last_sensor_data()
+        ):
+            self._attr_native_value = last_sensor_data.native_value
+
+    def set_value(self, value: float | None) -> None:
         """Set the value based on the timezone of the Home Assistant instance."""
+        if value is None:
+            self._attr_native_value = None
+            return
         local_tz = ZoneInfo(self.coordinator.hass.config.time_zone)
         self._attr_native_value = datetime.fromtimestamp(value, tz=local_tz)
 
     @callback
     def _handle_coordinator_update(self) -> None:
-        self.set_value(self.coordinator.data[self.entity_description.key]["time"])
+        if self.coordinator.data is not None:
+            self.set_value(self.coordinator.data.time)
+        self.async_write_ha_state()
+
+
+class OeSMADiagnosticSensor(OeSMAMeasurementEntityBase, SensorEntity):
+    """Representation of a Smart Meter Adapter diagnostic sensor."""
+
+    def __init__(
+        self,
+        coordinator: SMAMeasurementDataUpdateCoordinator,
+        entity_description: SensorEntityDescription,
+        value_fn: DiagnosticValueFn,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self.entity_description = entity_description
+        self._value_fn = value_fn
+        self._attr_unique_id = (
+            f"{coordinator.config_entry.entry_id}_{entity_description.key}"
+        )
+        self.translation_key = entity_description.translation_key
+
+        self._attr_native_value = value_fn(coordinator)
+
+    @property
+    def available(self) -> bool:
+        """Stay available, the diagnostics matter most while polls fail."""
+        return True
+
+    async def async_added_to_hass(self) -> None:
+        """Also update when a frame is dropped or quarantined."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_add_diagnostic_listener(
+                self._handle_coordinator_update
+            )
+        )
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        self._attr_native_value = self._value_fn(self.coordinator)
         self.async_write_ha_state()
@@ -0,0 +1,111 @@
+"""Services of the Smart Meter Adapter integration."""
+
+from __future__ import annotations
+
+from math import isnan
+from typing import TYPE_CHECKING
+
+import voluptuous as vol
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import ServiceCall, SupportsResponse, callback
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .buffer import downsample
+from .const import DOMAIN
+from .obis import OBIS_SLOTS, OBIS_UNITS
+
+if TYPE_CHECKING:
+    from array import array
+    from datetime import datetime
+
+    from homeassistant.core import HomeAssistant, ServiceResponse
+
+    from .data import SMAConfigEntry
+
+SERVICE_GET_HISTORY = "get_history"
+
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_KEYS = "keys"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_RESOLUTION = "resolution"
+
+SERVICE_GET_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_KEYS): vol.All(cv.ensure_list, [vol.In(OBIS_UNITS)]),
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_RESOLUTION): vol.All(cv.time_period, cv.positive_timedelta),
+    }
+)
+
+
+def _timestamp(value: datetime | None) -> float | None:
+    """Return the timestamp of a datetime, naive ones are in local time."""
+    return dt_util.as_utc(value).timestamp() if value is not None else None
+
+
+def _column(values: array[float]) -> list[float | None]:
+    """Return a column as JSON list, missing samples as null."""
+    return [None if isnan(value) else value for value in values.tolist()]
+
+
+def _get_entry(hass: HomeAssistant, entry_id: str) -> SMAConfigEntry:
+    """Return a loaded config entry of the integration."""
+    entry: SMAConfigEntry | None = hass.config_entries.async_get_entry(entry_id)
+    if (
+        entry is None
+        or entry.domain != DOMAIN
+        or entry.state is not ConfigEntryState.LOADED
+    ):
+        raise ServiceValidationError(
+            translation_domain=DOMAIN,
+            translation_key="entry_not_loaded",
+            translation_placeholders={"entry_id": entry_id},
+        )
+    return entry
+
+
+async def _async_get_history(call: ServiceCall) -> ServiceResponse:
+    """
+    Return buffered frames of an adapter as columns.
+
+    Every key maps to a list of values sharing the ``time`` list of the frame
+    timestamps in seconds, instead of repeating the keys in every sample. With
+    a resolution the samples are averaged per bucket.
+    """
+    entry = _get_entry(call.hass, call.data[ATTR_CONFIG_ENTRY_ID])
+    buffer = entry.runtime_data.measurement_coordinator.buffer
+    # all buffered registers by default
+    keys = call.data.get(ATTR_KEYS) or [
+        key for key in OBIS_UNITS if OBIS_SLOTS[key] in buffer.channels
+    ]
+    times, columns = buffer.columns(
+        (OBIS_SLOTS[key] for key in keys),
+        _timestamp(call.data.get(ATTR_START)),
+        _timestamp(call.data.get(ATTR_END)),
+    )
+    resolution = call.data.get(ATTR_RESOLUTION)
+    if resolution is not None:
+        times, columns = downsample(times, columns, resolution.total_seconds())
+    return {
+        "resolution": resolution.total_seconds() if resolution is not None else None,
+        "units": {key: OBIS_UNITS[key] for key in keys},
+        "time": times.tolist(),
+        "values": {key: _column(columns[OBIS_SLOTS[key]]) for key in keys},
+    }
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services of the integration."""
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_HISTORY,
+        _async_get_history,
+        schema=SERVICE_GET_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
@@ -0,0 +1,235 @@
+"""Long-term statistics of the Smart Meter measurements."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from itertools import batched
+from typing import TYPE_CHECKING
+
+from homeassistant.components.recorder.models import (
+    StatisticData,
+    StatisticMeanType,
+    StatisticMetaData,
+)
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+from homeassistant.util import slugify
+
+from .const import DOMAIN
+from .obis import OBIS_CODES, OBIS_KEYS, OBIS_REGISTERS, OBIS_SLOTS, OBIS_UNITS
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from .data import SMAConfigEntry
+    from .measurement import SMAMeasurement
+
+STORAGE_VERSION = 1
+# Seconds between two checkpoints of the counter readings
+STORAGE_SAVE_INTERVAL = 60
+# Number of hourly statistics imported at once
+IMPORT_BATCH_SIZE = 100
+HOUR = 60 * 60
+
+# Active energy counters with hourly sum statistics, the totals and the tariff
+# registers of import, export and both, and the totals of the other code set
+COUNTER_KEYS = (
+    *(f"1-0:{register}.8.{tariff}" for register in (1, 2, 15) for tariff in range(5)),
+    "1-1:1.8.0",
+    "1-1:2.8.0",
+)
+_COUNTER_SLOTS = tuple((key, OBIS_SLOTS[key]) for key in COUNTER_KEYS)
+
+# Slots of the instantaneous registers, counters have no meaningful mean
+MEAN_SLOTS = tuple(
+    OBIS_SLOTS[key] for key, unit in OBIS_UNITS.items() if unit not in ("Wh", "varh")
+)
+
+
+@dataclass(slots=True)
+class SMAAggregate:
+    """Min, max and mean of a channel over one window."""
+
+    start: float
+    min: float
+    max: float
+    mean: float
+
+
+class SMAWindowAggregator:
+    """Streaming min, max and mean of every channel over aligned windows."""
+
+    def __init__(self, period: int) -> None:
+        """Initialize the aggregator with the window length in seconds."""
+        self.period = period
+        self.start: float | None = None
+        # min, max, sum and count of every channel in the open window
+        self._window: dict[int, list[float]] = {}
+
+    def add(self, time: float, data: SMAMeasurement) -> dict[int, SMAAggregate] | None:
+        """Add a frame, return the aggregates of the window it closed."""
+        start = time - time % self.period
+        closed = None
+        if self.start is not None and start > self.start:
+            closed = {
+                slot: SMAAggregate(self.start, low, high, total / count)
+                for slot, (low, high, total, count) in self._window.items()
+            }
+            self._window = {}
+        if self.start is None or start > self.start:
+            self.start = start
+
+        values = data.values
+        for slot in MEAN_SLOTS:
+            value = values[slot]
+            if not isinstance(value, int | float):
+                continue
+            if (window := self._window.get(slot)) is None:
+                self._window[slot] = [value, value, value, 1]
+                continue
+            if value < window[0]:
+                window[0] = value
+            elif value > window[1]:
+                window[1] = value
+            window[2] += value
+            window[3] += 1
+        return closed
+
+
+def statistic_id(entry: SMAConfigEntry, key: str) -> str:
+    """Return the external statistic id of a register."""
+    return f"{DOMAIN}:{slugify(entry.unique_id or entry.entry_id)}_{slugify(key)}"
+
+
+def statistic_name(entry: SMAConfigEntry, key: str) -> str:
+    """Return the statistic name of a register, with the tariff of tariff registers."""
+    if (tariff := OBIS_REGISTERS[key].tariff) is not None:
+        total = f"{key.rpartition('.')[0]}.0"
+        return f"{entry.title} {OBIS_CODES[total]} T{tariff}"
+    return f"{entry.title} {OBIS_CODES[key] or key}"
+
+
+@callback
+def async_import_mean_statistics(
+    hass: HomeAssistant,
+    entry: SMAConfigEntry,
+    aggregates: dict[int, SMAAggregate],
+) -> None:
+    """Import hourly min, max and mean of the channels as external statistics."""
+    for slot, aggregate in aggregates.items():
+        key = OBIS_KEYS[slot]
+        async_add_external_statistics(
+            hass,
+            StatisticMetaData(
+                mean_type=StatisticMeanType.ARITHMETIC,
+                has_sum=False,
+                name=statistic_name(entry, key),
+                source=DOMAIN,
+                statistic_id=statistic_id(entry, key),
+                unit_of_measurement=OBIS_UNITS[key],
+            ),
+            [
+                StatisticData(
+                    start=dt_util.utc_from_timestamp(aggregate.start),
+                    min=aggregate.min,
+                    max=aggregate.max,
+                    mean=aggregate.mean,
+                )
+            ],
+        )
+
+
+def _hourly_rows(
+    start: tuple[float, ...], end: tuple[float, float]
+) -> Iterator[StatisticData]:
+    """Interpolate the counter at every full hour between two readings."""
+    last_time, last_value, total = start
+    time, value = end
+    delta = max(value - last_value, 0)
+    boundary = last_time - last_time % HOUR + HOUR
+    while boundary <= time:
+        state = last_value + delta * (boundary - last_time) / (time - last_time)
+        yield StatisticData(
+            start=dt_util.utc_from_timestamp(boundary - HOUR),
+            state=state,
+            sum=total + state - last_value,
+        )
+        boundary += HOUR
+
+
+class SMACounterStatistics:
+    """
+    Hourly sum statistics of the energy counters, generated from counter deltas.
+
+    The last reading of every counter is checkpointed to disk, so a gap caused
+    by an unreachable adapter or a restart of Home Assistant is backfilled by
+    interpolation as soon as the next frame arrives.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry: SMAConfigEntry) -> None:
+        """Initialize the counter statistics."""
+        self.hass = hass
+        self.entry = entry
+        self._store: Store[dict[str, list[float]]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.counters"
+        )
+        # time, value and sum of the last reading of every counter
+        self._counters: dict[str, list[float]] = {}
+        self._next_save = 0.0
+
+    async def async_load(self) -> None:
+        """Load the last checkpoint."""
+        self._counters = await self._store.async_load() or {}
+
+    @callback
+    def async_add(self, time: float, data: SMAMeasurement) -> None:
+        """Add a frame and import the statistics of every completed hour."""
+        gaps: dict[str, Iterator[StatisticData]] = {}
+        values = data.values
+        for key, slot in _COUNTER_SLOTS:
+            value = values[slot]
+            if not isinstance(value, int | float):
+                continue
+            if (counter := self._counters.get(key)) is None:
+                self._counters[key] = [time, value, 0.0]
+                continue
+            if time <= counter[0]:
+                continue
+            if time - time % HOUR > counter[0]:
+                gaps[key] = _hourly_rows(tuple(counter), (time, value))
+            # a counter going backwards is a new meter, keep the sum steady
+            counter[:] = [time, value, counter[2] + max(value - counter[1], 0)]
+
+        if gaps:
+            self.entry.async_create_background_task(
+                self.hass,
+                self._async_import(gaps),
+                name=f"{DOMAIN} - {self.entry.title} - counter statistics",
+            )
+        if time >= self._next_save:
+            self._next_save = time + STORAGE_SAVE_INTERVAL
+            self._store.async_delay_save(lambda: self._counters)
+
+    async def _async_import(self, gaps: dict[str, Iterator[StatisticData]]) -> None:
+        """Import the hourly statistics in batches to keep the event loop free."""
+        for key, rows in gaps.items():
+            metadata = StatisticMetaData(
+                mean_type=StatisticMeanType.NONE,
+                has_sum=True,
+                name=statistic_name(self.entry, key),
+                source=DOMAIN,
+                statistic_id=statistic_id(self.entry, key),
+                unit_of_measurement=OBIS_UNITS[key],
+            )
+            for batch in batched(rows, IMPORT_BATCH_SIZE, strict=False):
+                async_add_external_statistics(self.hass, metadata, batch)
+                await asyncio.sleep(0)
+
+    async def async_remove(self) -> None:
+        """Remove the checkpoint."""
+        await self._store.async_remove()
@@ -0,0 +1,162 @@
+"""Streaming plausibility checks of the Smart Meter frames."""
+
+from __future__ import annotations
+
+from collections import deque
+from math import inf, isfinite
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from .const import (
+    PLAUSIBLE_RANGES,
+    QUARANTINE_PERSISTENCE,
+    QUARANTINE_SIZE,
+    RATE_LIMITS,
+)
+from .obis import OBIS_KEYS, OBIS_REGISTERS, OBIS_SLOTS
+
+if TYPE_CHECKING:
+    from .measurement import SMAMeasurement
+
+
+class _Channel(NamedTuple):
+    """Checks of a numeric register."""
+
+    slot: int
+    key: str
+    low: float
+    high: float
+    # largest change per second, None without limit
+    rate: float | None
+    counter: bool
+
+
+_CHANNELS = tuple(
+    _Channel(
+        OBIS_SLOTS[key],
+        key,
+        *PLAUSIBLE_RANGES.get(register.device_class or "", (-inf, inf)),
+        RATE_LIMITS.get(register.device_class or ""),
+        register.state_class == "total",
+    )
+    for key, register in OBIS_REGISTERS.items()
+)
+
+
+# Violations of a single value, kept as accepted state once persistent
+_STATES = ("not_numeric", "out_of_range")
+
+
+def _is_number(value: Any) -> bool:
+    """Return if a value is a finite number."""
+    return (
+        isinstance(value, int | float)
+        and not isinstance(value, bool)
+        and isfinite(value)
+    )
+
+
+class SMAFrameValidator:
+    """
+    Quarantine frames with implausible registers before they are published.
+
+    Every numeric register of a frame has to be a finite number within the
+    plausible range of its device class. Counters must not go backwards and
+    counters and voltages must not change faster than their rate limit since
+    the last accepted frame. A single violation quarantines the whole frame.
+    Exactly 0 is the value of an absent phase, it is never out of range and
+    changing from or to it is no jump.
+
+    Only the last accepted value, its time and the consecutive violations of
+    one reason are kept per register. A violation persisting for more than
+    ``QUARANTINE_PERSISTENCE`` frames is taken as real, like a replaced meter
+    or an unused phase: its value becomes the new reference and the count
+    starts over. A register persistently outside of its range or without a
+    number keeps that state accepted until it leaves it, its changes are
+    still checked against the reference. Every frame time is judged once, a
+    repeated frame gets the same verdict without counting again.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the validator."""
+        self.rejected_frames = 0
+        # violations of the last quarantined frames
+        self.quarantine: deque[dict[str, Any]] = deque(maxlen=QUARANTINE_SIZE)
+        self._last: list[float | None] = [None] * len(OBIS_KEYS)
+        self._last_time = [0.0] * len(OBIS_KEYS)
+        self._strikes = [0] * len(OBIS_KEYS)
+        self._reasons: list[str | None] = [None] * len(OBIS_KEYS)
+        # persistent out of range or not numeric state, taken as real
+        self._accepted: list[str | None] = [None] * len(OBIS_KEYS)
+        # time and verdict of the last judged frame
+        self._verdict: tuple[float, bool] | None = None
+
+    def validate(self, time: float, data: SMAMeasurement) -> bool:
+        """Check a frame, return if it may be published."""
+        if self._verdict is not None and self._verdict[0] == time:
+            return self._verdict[1]
+        values = data.values
+        present = data.present
+        violations = {}
+        for channel in _CHANNELS:
+            slot = channel.slot
+            if not present >> slot & 1:
+                continue
+            value = values[slot]
+            if (reason := self._violation(channel, time, value)) is None:
+                self._strikes[slot] = 0
+                continue
+            if reason != self._reasons[slot]:
+                self._reasons[slot] = reason
+                self._strikes[slot] = 0
+            self._strikes[slot] += 1
+            if self._strikes[slot] <= QUARANTINE_PERSISTENCE:
+                violations[channel.key] = {"reason": reason, "value": value}
+                continue
+            # a persistent violation is real, judge the next frames against it
+            self._strikes[slot] = 0
+            if reason in _STATES:
+                self._accepted[slot] = reason
+            if _is_number(value):
+                self._last[slot] = value
+                self._last_time[slot] = time
+
+        self._verdict = (time, not violations)
+        if violations:
+            self.rejected_frames += 1
+            self.quarantine.append({"time": time, "violations": violations})
+            return False
+
+        for slot, *_ in _CHANNELS:
+            if present >> slot & 1 and isinstance(value := values[slot], int | float):
+                self._last[slot] = value
+                self._last_time[slot] = time
+        return True
+
+    def _violation(self, channel: _Channel, time: float, value: Any) -> str | None:
+        """Return the reason a value of a register is implausible, if it is."""
+        slot = channel.slot
+        if not _is_number(value):
+            state = "not_numeric"
+        elif value and not channel.low <= value <= channel.high:
+            state = "out_of_range"
+        else:
+            state = None
+        if state != self._accepted[slot]:
+            # left the persistent state, or entered another one
+            self._accepted[slot] = None
+            if state is not None:
+                return state
+        elif state == "not_numeric":
+            return None
+
+        last = self._last[slot]
+        if last is None or not (channel.counter or (value and last)):
+            # nothing to compare with, or a phase appearing or going absent
+            return None
+        if channel.counter and value < last:
+            return "counter_decreased"
+        if channel.rate is not None and abs(value - last) > channel.rate * max(
+            time - self._last_time[slot], 0.0
+        ):
+            return "rate_exceeded"
+        return None
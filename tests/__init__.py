@@ -0,0 +1 @@
+"""Tests of the Smart Meter Adapter integration."""
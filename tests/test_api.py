@@ -0,0 +1,100 @@
+"""Tests of the request coalescing and circuit breaker of the API client."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any
+
+import aiohttp
+import pytest
+from pytest_homeassistant_custom_component.test_util.aiohttp import (
+    AiohttpClientMocker,
+    AiohttpClientMockResponse,
+)
+
+from custom_components.oesterreichsenergie_sma import api
+from custom_components.oesterreichsenergie_sma.api import (
+    BREAKER_BASE_DELAY,
+    BREAKER_THRESHOLD,
+    SMAApiClient,
+    SMAApiClientCommunicationError,
+    SMACircuitBreaker,
+)
+
+if TYPE_CHECKING:
+    from yarl import URL
+
+HOST = "http://adapter.local"
+MEASUREMENT_URL = f"{HOST}/api/v1/measurement.json"
+FRAME = {"1-0:1.7.0": {"value": 5}}
+
+
+@pytest.fixture
+def no_jitter(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Keep the breaker open for the full period."""
+    monkeypatch.setattr(api.random, "uniform", lambda _, high: high)
+
+
+@pytest.mark.usefixtures("no_jitter")
+def test_breaker_opens_at_threshold_doubles_and_closes() -> None:
+    """The breaker opens after the threshold and doubles with every failure."""
+    breaker = SMACircuitBreaker()
+    for _ in range(BREAKER_THRESHOLD - 1):
+        breaker.record_failure(0.0)
+        assert breaker.retry_in(0.0) == 0
+    breaker.record_failure(0.0)
+    assert breaker.retry_in(0.0) == BREAKER_BASE_DELAY
+
+    # the probe after the period failed as well
+    breaker.record_failure(BREAKER_BASE_DELAY)
+    assert breaker.retry_in(BREAKER_BASE_DELAY) == 2 * BREAKER_BASE_DELAY
+
+    breaker.record_response()
+    assert breaker.retry_in(BREAKER_BASE_DELAY) == 0
+
+
+@pytest.mark.usefixtures("no_jitter")
+async def test_open_breaker_fails_without_request(
+    aioclient_mock: AiohttpClientMocker,
+) -> None:
+    """An unreachable adapter is not asked again while the breaker is open."""
+    aioclient_mock.get(MEASUREMENT_URL, exc=aiohttp.ClientConnectionError())
+    session = aioclient_mock.create_session(asyncio.get_running_loop())
+    client = SMAApiClient(HOST, "token", session)
+
+    rejected = 2
+    for _ in range(BREAKER_THRESHOLD + rejected):
+        with pytest.raises(SMAApiClientCommunicationError):
+            await client.async_get_measurement()
+    assert aioclient_mock.call_count == BREAKER_THRESHOLD
+    assert client.metrics.rejected == rejected
+    await session.close()
+
+
+async def test_cancelled_caller_leaves_shared_request(
+    aioclient_mock: AiohttpClientMocker,
+) -> None:
+    """Concurrent callers share one request, which outlives a cancelled one."""
+    requested = asyncio.Event()
+    respond = asyncio.Event()
+
+    async def _respond(method: str, url: URL, _: Any) -> AiohttpClientMockResponse:
+        requested.set()
+        await respond.wait()
+        return AiohttpClientMockResponse(method, url, json=FRAME)
+
+    aioclient_mock.get(MEASUREMENT_URL, side_effect=_respond)
+    session = aioclient_mock.create_session(asyncio.get_running_loop())
+    client = SMAApiClient(HOST, "token", session)
+
+    cancelled = asyncio.create_task(client.async_get_measurement())
+    waiting = asyncio.create_task(client.async_get_measurement())
+    await requested.wait()
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    respond.set()
+
+    assert await waiting == FRAME
+    assert cancelled.cancelled()
+    assert aioclient_mock.call_count == 1
+    await session.close()
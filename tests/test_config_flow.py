@@ -0,0 +1,51 @@
+"""Tests of the config flow."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+from unittest.mock import patch
+
+from homeassistant import config_entries
+from homeassistant.const import CONF_HOST, CONF_TOKEN, CONF_VERIFY_SSL
+from homeassistant.data_entry_flow import FlowResultType
+
+from custom_components.oesterreichsenergie_sma.const import DOMAIN
+
+if TYPE_CHECKING:
+    from homeassistant.components.recorder import Recorder
+    from homeassistant.core import HomeAssistant
+    from pytest_homeassistant_custom_component.test_util.aiohttp import (
+        AiohttpClientMocker,
+    )
+
+HOST = "http://adapter.local"
+STATUS = {"name": "Meter", "wifi": {"mac": "00:11:22:33:44:55"}}
+
+
+async def test_manual_setup_leaves_hub_alone(
+    recorder_mock: Recorder,  # noqa: ARG001 Set up before hass, a dependency
+    hass: HomeAssistant,
+    enable_custom_integrations: None,  # noqa: ARG001 Loads the integration
+    aioclient_mock: AiohttpClientMocker,
+) -> None:
+    """The probe uses the shared session, not the pool of the adapters."""
+    aioclient_mock.get(f"{HOST}/api/v1/status.json", json=STATUS)
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER}
+    )
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"next_step_id": "manual"}
+    )
+    with patch(
+        "custom_components.oesterreichsenergie_sma.async_setup_entry",
+        return_value=True,
+    ):
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"],
+            {CONF_HOST: HOST, CONF_VERIFY_SSL: False, CONF_TOKEN: "token"},
+        )
+
+    assert result["type"] is FlowResultType.CREATE_ENTRY
+    assert result["title"] == STATUS["name"]
+    # no connection pool is opened without a loaded entry
+    assert DOMAIN not in hass.data
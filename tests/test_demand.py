@@ -0,0 +1,85 @@
+"""Tests of the rolling quarter hour demand."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_capture_events,
+)
+
+from custom_components.oesterreichsenergie_sma.const import (
+    CONF_DEMAND_LIMIT,
+    DOMAIN,
+    EVENT_DEMAND_LIMIT,
+    EVENT_DEMAND_WINDOW,
+)
+from custom_components.oesterreichsenergie_sma.demand import (
+    DEMAND_PERIOD,
+    HOUR,
+    SMADemandTracker,
+)
+from custom_components.oesterreichsenergie_sma.derived import MEASUREMENT_SLOTS
+from custom_components.oesterreichsenergie_sma.measurement import (
+    SMAMeasurement,
+    parse_measurement,
+)
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+# import power [W] before and after the end of the first full window
+LOW = 1000
+HIGH = 2000
+LIMIT = 1500
+# a window boundary, the frames are off by some seconds
+START = 1_750_000_500 - 1_750_000_500 % DEMAND_PERIOD
+STEP = 10
+
+
+def _frame(energy: float, power: float) -> SMAMeasurement:
+    """Return a frame of the import counter and the import power."""
+    return parse_measurement(
+        {"1-0:1.8.0": {"value": energy}, "1-0:1.7.0": {"value": power}}
+    )
+
+
+async def test_windows_roll_over_with_one_event_each(hass: HomeAssistant) -> None:
+    """Every window is closed once, the limit is reported once per window."""
+    entry = MockConfigEntry(domain=DOMAIN, data={}, options={CONF_DEMAND_LIMIT: LIMIT})
+    entry.add_to_hass(hass)
+    tracker = SMADemandTracker(hass, entry)
+    await tracker.async_load()
+    windows = async_capture_events(hass, EVENT_DEMAND_WINDOW)
+    limits = async_capture_events(hass, EVENT_DEMAND_LIMIT)
+
+    time = START - DEMAND_PERIOD / 3 + 3
+    energy = 10_000.0
+    while time < START + 2 * DEMAND_PERIOD + STEP:
+        power = LOW if time < START + DEMAND_PERIOD else HIGH
+        frame = _frame(energy, power)
+        tracker.async_add(time, frame)
+        time += STEP
+        energy += power * STEP / HOUR
+    await hass.async_block_till_done()
+
+    # the first window started with the first frame, the others at the boundary,
+    # the power changes with a frame a few seconds after it
+    assert [event.data["demand"] for event in windows] == pytest.approx(
+        [LOW, LOW, HIGH], rel=0.01
+    )
+    assert [event.data["complete"] for event in windows] == [False, True, True]
+    assert [event.data["peak"] for event in windows] == [False, True, True]
+    assert windows[1].data["window_start"] == windows[0].data["window_end"]
+
+    # only the window of the higher power exceeds the limit, reported once
+    assert [event.data["window_start"] for event in limits] == [
+        windows[2].data["window_start"]
+    ]
+    assert limits[0].data["projected_demand"] > LIMIT
+
+    values = frame.values
+    for key in ("window_demand", "peak_demand", "projected_demand"):
+        assert values[MEASUREMENT_SLOTS[key]] == pytest.approx(HIGH, rel=0.01)
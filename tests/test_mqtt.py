@@ -0,0 +1,88 @@
+"""Tests of the measurement frames pushed by the adapter via MQTT."""
+
+from __future__ import annotations
+
+import json
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any
+from unittest.mock import AsyncMock
+
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_mqtt_message,
+    async_fire_time_changed,
+)
+
+from custom_components.oesterreichsenergie_sma.const import (
+    DOMAIN,
+    LOGGER,
+    MQTT_FALLBACK_TIMEOUT,
+)
+from custom_components.oesterreichsenergie_sma.coordinator import (
+    SMAMeasurementDataUpdateCoordinator,
+)
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+    from pytest_homeassistant_custom_component.typing import MqttMockHAClient
+
+TOPIC = "sma/adapter"
+
+
+def _frame(time: int, power: int) -> dict[str, Any]:
+    """Return a frame of the meter time and the active power."""
+    return {
+        "0-0:1.0.0": {"value": "", "time": time},
+        "1-0:1.7.0": {"value": power, "time": time},
+    }
+
+
+async def test_push_and_fallback_after_silence(
+    hass: HomeAssistant,
+    mqtt_mock: MqttMockHAClient,  # noqa: ARG001 Sets up the MQTT client
+) -> None:
+    """Pushed frames replace polling until the pushes fall silent."""
+    entry = MockConfigEntry(domain=DOMAIN, data={})
+    entry.add_to_hass(hass)
+    client = SimpleNamespace(async_get_measurement=AsyncMock(return_value=_frame(3, 7)))
+    entry.runtime_data = SimpleNamespace(client=client)
+    coordinator = SMAMeasurementDataUpdateCoordinator(
+        hass=hass,
+        logger=LOGGER,
+        config_entry=entry,
+        name=DOMAIN,
+        update_interval=timedelta(seconds=15),
+    )
+    updates = []
+    coordinator.async_add_listener(
+        lambda: updates.append(coordinator.data.get("1-0:1.7.0"))
+    )
+    dropped = []
+    coordinator.async_add_diagnostic_listener(
+        lambda: dropped.append(coordinator.dropped_frames)
+    )
+    assert await coordinator.async_subscribe_mqtt(TOPIC)
+
+    start = dt_util.utcnow()
+    async_fire_mqtt_message(hass, TOPIC, json.dumps(_frame(1, 5)))
+    await hass.async_block_till_done()
+    assert updates == [5]
+
+    # the repeated frame is dropped and does not postpone the fallback
+    async_fire_time_changed(hass, start + timedelta(seconds=MQTT_FALLBACK_TIMEOUT - 5))
+    async_fire_mqtt_message(hass, TOPIC, json.dumps(_frame(1, 5)))
+    await hass.async_block_till_done()
+    assert updates == [5]
+    # the counter is updated without waiting for the next new frame
+    assert dropped == [1]
+    client.async_get_measurement.assert_not_called()
+
+    async_fire_time_changed(hass, start + timedelta(seconds=MQTT_FALLBACK_TIMEOUT + 1))
+    await hass.async_block_till_done()
+    client.async_get_measurement.assert_awaited_once()
+    assert updates == [5, 7]
+    assert dropped == [1]
+
+    await coordinator.async_shutdown()
@@ -0,0 +1,41 @@
+"""Tests of the OBIS register table."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from custom_components.oesterreichsenergie_sma.obis import OBIS_REGISTERS
+
+TRANSLATIONS = (
+    Path(__file__).parent.parent
+    / "custom_components"
+    / "oesterreichsenergie_sma"
+    / "translations"
+)
+
+
+@pytest.mark.parametrize("language", ["en", "de"])
+def test_registers_are_translated(language: str) -> None:
+    """Every register has a sensor name in every language."""
+    translations = json.loads((TRANSLATIONS / f"{language}.json").read_text())
+    keys = {register.translation_key for register in OBIS_REGISTERS.values()}
+    assert keys <= set(translations["entity"]["sensor"])
+
+
+def test_code_sets_have_distinct_names() -> None:
+    """The registers of the second code set are not named like the first one."""
+    first = {
+        register.translation_key
+        for key, register in OBIS_REGISTERS.items()
+        if key.startswith("1-0:")
+    }
+    second = {
+        register.translation_key
+        for key, register in OBIS_REGISTERS.items()
+        if key.startswith("1-1:")
+    }
+    assert second
+    assert not first & second
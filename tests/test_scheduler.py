@@ -0,0 +1,112 @@
+"""Tests of the polling scheduler aligned to the frame clock of the meter."""
+
+from __future__ import annotations
+
+from itertools import pairwise
+from math import floor
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.oesterreichsenergie_sma.hub import SMAHub
+from custom_components.oesterreichsenergie_sma.scheduler import (
+    FRAME_GUARD,
+    SMAFrameScheduler,
+)
+
+INTERVAL = 15.0
+PERIOD = 1.0
+# delay between the frame time of the meter and its availability on the adapter
+AVAILABLE_AFTER = 0.3
+
+
+def _poll(
+    scheduler: SMAFrameScheduler, start: float, polls: int, drift: float = 0.0
+) -> list[tuple[float, float]]:
+    """
+    Poll an adapter publishing every ``PERIOD`` seconds as scheduled.
+
+    The clock of the meter gains ``drift`` seconds per second on the local
+    clock. Return the local time of every poll and how long the fetched frame
+    was available by then, by the clock of the meter.
+    """
+    now = start
+    polled = []
+    for _ in range(polls):
+        available = now * (1 + drift) - AVAILABLE_AFTER
+        frame_time = floor(available / PERIOD) * PERIOD
+        scheduler.observe(frame_time, now)
+        polled.append((now, available - frame_time))
+        now += scheduler.next_delay(now)
+    return polled
+
+
+def test_locks_onto_frame_clock() -> None:
+    """The period is learned and polls land right after a frame."""
+    scheduler = SMAFrameScheduler(INTERVAL)
+    assert not scheduler.locked
+
+    polled = _poll(scheduler, 1000.7, 40)
+    assert scheduler.locked
+    assert scheduler.period == PERIOD
+    # probing for an earlier frame misses one now and then
+    recent = polled[-20:]
+    on_time = [behind for _, behind in recent if behind < PERIOD / 2]
+    assert len(on_time) >= 0.75 * len(recent)
+    assert max(on_time) <= FRAME_GUARD
+
+
+@pytest.mark.parametrize("drift", [5e-4, -5e-4])
+def test_follows_drift_of_the_meter_clock(drift: float) -> None:
+    """A meter clock running fast or slow is followed by the latency."""
+    scheduler = SMAFrameScheduler(INTERVAL)
+    # over eight hours the meter clock moves by 15 seconds
+    polled = _poll(scheduler, 1000.7, 2000, drift)
+    last_poll, _ = polled[-1]
+
+    assert scheduler.latency == pytest.approx(-drift * last_poll, abs=PERIOD)
+    recent = polled[-500:]
+    on_time = [behind for _, behind in recent if behind < PERIOD / 2]
+    assert len(on_time) >= 0.9 * len(recent)
+    assert max(on_time) <= FRAME_GUARD + 0.1
+
+
+def test_missed_frame_backs_off() -> None:
+    """A poll fetching an older frame than targeted polls later from then on."""
+    scheduler = SMAFrameScheduler(INTERVAL)
+    now, _ = _poll(scheduler, 1000.7, 40)[-1]
+    latency = scheduler.latency
+    missed = scheduler.missed
+    now += scheduler.next_delay(now)
+
+    # the adapter still serves the frame before the targeted one
+    frame_time = floor((now - AVAILABLE_AFTER) / PERIOD) * PERIOD - PERIOD
+    scheduler.observe(frame_time, now)
+    assert scheduler.missed == missed + 1
+    assert scheduler.latency == latency + FRAME_GUARD
+    assert scheduler.next_delay(now) % PERIOD == pytest.approx(
+        (frame_time + scheduler.latency + FRAME_GUARD - now) % PERIOD
+    )
+
+
+def test_synced_adapters_are_spread_after_lock() -> None:
+    """Adapters on meters publishing at the same time fetch different frames."""
+    hub = SMAHub(None)  # type: ignore[arg-type]
+    schedulers = [SMAFrameScheduler(INTERVAL) for _ in range(4)]
+    for index, scheduler in enumerate(schedulers):
+        entry = SimpleNamespace(entry_id=str(index))
+        hub.async_register(entry, scheduler)  # type: ignore[arg-type]
+
+    polled = [_poll(scheduler, 1000.0, 40)[-10:] for scheduler in schedulers]
+    assert all(scheduler.locked for scheduler in schedulers)
+    # every adapter keeps its own second of the interval, right after the frame
+    assert [{floor(now % INTERVAL) for now, _ in polls} for polls in polled] == [
+        {0},
+        {4},
+        {8},
+        {11},
+    ]
+    for polls in polled:
+        for (earlier, _), (later, _) in pairwise(polls):
+            # at the nominal rate, apart from probing for an earlier frame
+            assert abs(later - earlier - INTERVAL) <= FRAME_GUARD
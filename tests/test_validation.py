@@ -0,0 +1,76 @@
+"""Tests of the plausibility checks of the Smart Meter frames."""
+
+from __future__ import annotations
+
+from custom_components.oesterreichsenergie_sma.const import QUARANTINE_PERSISTENCE
+from custom_components.oesterreichsenergie_sma.measurement import (
+    SMAMeasurement,
+    parse_measurement,
+)
+from custom_components.oesterreichsenergie_sma.validation import SMAFrameValidator
+
+ENERGY = "1-0:1.8.0"
+VOLTAGE = "1-0:32.7.0"
+
+
+def _frame(energy: float = 1000.0, voltage: float = 230.0) -> SMAMeasurement:
+    """Return a frame of the import counter and the voltage of phase L1."""
+    return parse_measurement({ENERGY: {"value": energy}, VOLTAGE: {"value": voltage}})
+
+
+def _persistent(
+    validator: SMAFrameValidator, start: float, frame: SMAMeasurement
+) -> list[bool]:
+    """Validate a frame at consecutive times until it is taken as real."""
+    return [
+        validator.validate(start + index, frame)
+        for index in range(QUARANTINE_PERSISTENCE + 1)
+    ]
+
+
+def test_repeated_frame_is_judged_once() -> None:
+    """A quarantined frame polled again is not taken as real."""
+    validator = SMAFrameValidator()
+    assert validator.validate(0, _frame())
+
+    for _ in range(QUARANTINE_PERSISTENCE + 3):
+        assert not validator.validate(1, _frame(energy=5))
+    assert validator.rejected_frames == 1
+    assert validator.validate(2, _frame(energy=1001))
+
+
+def test_persistent_violation_starts_over() -> None:
+    """A violation taken as real does not let later violations through."""
+    validator = SMAFrameValidator()
+    assert validator.validate(0, _frame())
+
+    # a voltage persistently below the range
+    expected = [False] * QUARANTINE_PERSISTENCE + [True]
+    assert _persistent(validator, 1, _frame(voltage=60)) == expected
+    assert validator.validate(10, _frame(voltage=60))
+    assert not validator.validate(11, _frame(voltage=5000))
+    assert validator.quarantine[-1]["violations"][VOLTAGE]["reason"] == (
+        "rate_exceeded"
+    )
+
+    # a replaced meter, followed by a glitch of the new counter
+    assert _persistent(validator, 20, _frame(energy=5, voltage=60)) == expected
+    assert not validator.validate(30, _frame(energy=4, voltage=60))
+    assert validator.quarantine[-1]["violations"][ENERGY]["reason"] == (
+        "counter_decreased"
+    )
+
+
+def test_absent_phase_is_accepted() -> None:
+    """An unused phase reporting 0 V is not quarantined, not even at a start."""
+    validator = SMAFrameValidator()
+    assert validator.validate(0, _frame(voltage=0))
+    assert validator.validate(1, _frame(voltage=0))
+
+    # the phase comes back and goes absent again
+    assert validator.validate(2, _frame(voltage=230))
+    assert validator.validate(3, _frame(voltage=0))
+    assert validator.rejected_frames == 0
+
+    # a counter dropping to 0 is still a glitch
+    assert not validator.validate(4, _frame(energy=0, voltage=0))